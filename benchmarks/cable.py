@@ -0,0 +1,66 @@
+"""Benchmark the multi-compartment HH cable against its compartment count.
+
+Every run stimulates the first 5% of a 5 mm cable at the 0.05 ms step of
+hw1/HH.py and checks that the action potential reaches the far end, so the
+timings double as a stability check of the implicit axial solver.
+
+    python benchmarks/cable.py --sizes 10 100 1000 10000 --json out.json
+"""
+
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from hw1.cable import HHCable  # noqa: E402
+
+
+def benchmark(n_compartments: int, steps: int, deltaTms: float = 0.05) -> dict:
+    cable = HHCable(nCompartments=n_compartments)
+    stim = np.zeros(n_compartments)
+    stimulated = max(n_compartments // 20, 1)
+    far_end_peak = -np.inf
+
+    start = time.perf_counter()
+    for i in range(steps):
+        stim[:stimulated] = 100 if 100 <= i < 120 else 0
+        cable.Iterate(stimulusCurrent=stim, deltaTms=deltaTms)
+        far_end_peak = max(far_end_peak, cable.Vm[-1])
+    elapsed = time.perf_counter() - start
+
+    return {
+        "n_compartments": n_compartments,
+        "us_per_step": elapsed / steps * 1e6,
+        "ns_per_compartment_step": elapsed / (steps * n_compartments) * 1e9,
+        "finite": bool(np.isfinite(cable.Vm).all()),
+        "propagated": bool(far_end_peak > 50),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1000, 10000])
+    parser.add_argument("--steps", type=int, default=500)
+    parser.add_argument("--json", type=Path, help="Also write the results here")
+    args = parser.parse_args()
+
+    results = []
+    print(f"{'N':>7}{'us/step':>10}{'ns/comp-step':>14}{'finite':>8}{'propagated':>12}")
+    for n_compartments in args.sizes:
+        result = benchmark(n_compartments, args.steps)
+        results.append(result)
+        print(
+            f"{n_compartments:>7}{result['us_per_step']:>10.1f}"
+            f"{result['ns_per_compartment_step']:>14.1f}"
+            f"{result['finite']!s:>8}{result['propagated']!s:>12}"
+        )
+    if args.json:
+        args.json.write_text(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
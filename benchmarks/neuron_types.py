@@ -0,0 +1,83 @@
+"""Benchmark the hw1 Nengo neuron types against nengo.LIF.
+
+Each type represents a 1 Hz sine in a single ensemble; the script reports
+build and run time, neuron updates per second and the decoding error.
+
+    python benchmarks/neuron_types.py --sizes 100 1000 10000 --json out.json
+"""
+
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+import nengo
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from hw1.izhikevich import ModelType  # noqa: E402
+from hw1.nengo_neurons import HodgkinHuxley, Izhikevich  # noqa: E402
+
+NEURON_TYPES = {
+    "LIF": (nengo.LIF(), {}),
+    "HodgkinHuxley": (HodgkinHuxley(), {"max_rates": nengo.dists.Uniform(60, 120)}),
+    "Izhikevich (RS)": (Izhikevich.from_model_type(ModelType.REGULAR_SPIKING), {}),
+}
+
+
+def benchmark(neuron_type, n_neurons: int, duration: float, **ensemble_kwargs) -> dict:
+    with nengo.Network(seed=0) as model:
+        input_node = nengo.Node(lambda t: np.sin(2 * np.pi * t))
+        ens = nengo.Ensemble(
+            n_neurons, dimensions=1, neuron_type=neuron_type, **ensemble_kwargs
+        )
+        nengo.Connection(input_node, ens)
+        probe = nengo.Probe(ens, synapse=0.01)
+
+    start = time.perf_counter()
+    with nengo.Simulator(model, progress_bar=False) as sim:
+        built = time.perf_counter()
+        sim.run(duration)
+        ran = time.perf_counter()
+
+    target = np.sin(2 * np.pi * sim.trange())
+    settled = sim.trange() > 0.1
+    rmse = np.sqrt(np.mean((sim.data[probe][settled, 0] - target[settled]) ** 2))
+    return {
+        "n_neurons": n_neurons,
+        "build_s": built - start,
+        "run_s": ran - built,
+        "neuron_updates_per_s": n_neurons * sim.n_steps / (ran - built),
+        "rmse": float(rmse),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 10000])
+    parser.add_argument("--duration", type=float, default=1.0)
+    parser.add_argument("--json", type=Path, help="Also write the results here")
+    args = parser.parse_args()
+
+    results = {}
+    print(
+        f"{'neuron type':<18}{'N':>7}{'build [s]':>11}{'run [s]':>9}"
+        f"{'updates/s':>12}{'RMSE':>8}"
+    )
+    for name, (neuron_type, kwargs) in NEURON_TYPES.items():
+        results[name] = []
+        for n_neurons in args.sizes:
+            result = benchmark(neuron_type, n_neurons, args.duration, **kwargs)
+            results[name].append(result)
+            print(
+                f"{name:<18}{n_neurons:>7}{result['build_s']:>11.2f}"
+                f"{result['run_s']:>9.2f}{result['neuron_updates_per_s']:>12.3g}"
+                f"{result['rmse']:>8.3f}"
+            )
+    if args.json:
+        args.json.write_text(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""Benchmark the noisy hw1 populations and check their reproducibility.
+
+For each model the script times a noisy population against a deterministic
+one (the difference being the cost of drawing the noise) and times the
+draws alone, generated on the simulating thread as they are when no core is
+spare for the prefetch thread of common.rng. It then reruns the
+noisy population split unevenly across worker processes and checks that the
+spikes and final state match the single-process run exactly.
+
+    python benchmarks/noise.py --neurons 100000 --steps 200 --workers 3
+"""
+
+import argparse
+import json
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from common.rng import BlockNormals  # noqa: E402
+from hw1.izhikevich import ModelType  # noqa: E402
+from hw1.populations import (  # noqa: E402
+    HHPopulation,
+    IzhikevichPopulation,
+    LIFPopulation,
+)
+
+MODELS = {
+    "HH (channel noise)": (lambda n, **kw: HHPopulation(n, **kw), True, 8.0),
+    "Izhikevich RS (input noise)": (
+        lambda n, **kw: IzhikevichPopulation.from_model_type(
+            ModelType.REGULAR_SPIKING, n, **kw
+        ),
+        2.0,
+        5.0,
+    ),
+    "LIF (input noise)": (lambda n, **kw: LIFPopulation(n, **kw), 0.02, 0.03),
+}
+
+
+def simulate(name, start, stop, steps, seed, noisy=True) -> tuple:
+    make, noise, stim = MODELS[name]
+    population = make(stop - start, noise=noise if noisy else 0, seed=seed, start=start)
+    spikes = np.zeros(stop - start, dtype=np.int64)
+    begin = time.perf_counter()
+    for _ in range(steps):
+        spikes += population.step(stim)
+    elapsed = time.perf_counter() - begin
+    return spikes, dict(population.state), elapsed
+
+
+def draw_cost(neurons, steps, per_neuron, seed) -> float:
+    """
+    Returns the time [ns] per draw of generating `per_neuron` draws per
+    neuron per step without prefetching
+    """
+    normals = BlockNormals(seed, 0, neurons, per_neuron, prefetch=False)
+    begin = time.perf_counter()
+    for _ in range(steps):
+        normals.next()
+    return (time.perf_counter() - begin) / (neurons * steps * per_neuron) * 1e9
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--neurons", type=int, default=100000)
+    parser.add_argument("--steps", type=int, default=200)
+    parser.add_argument("--workers", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", type=Path, help="Also write the results here")
+    args = parser.parse_args()
+
+    # Uneven split points, deliberately not aligned to the RNG blocks
+    bounds = np.linspace(0, args.neurons, args.workers + 1).astype(int)
+    bounds[1:-1] += np.arange(1, args.workers) * 37
+    results = {}
+    for name in MODELS:
+        _, _, plain = simulate(name, 0, args.neurons, args.steps, args.seed, False)
+        spikes, state, noisy = simulate(name, 0, args.neurons, args.steps, args.seed)
+        with ProcessPoolExecutor(args.workers) as pool:
+            parts = list(
+                pool.map(
+                    simulate,
+                    [name] * args.workers,
+                    bounds[:-1],
+                    bounds[1:],
+                    [args.steps] * args.workers,
+                    [args.seed] * args.workers,
+                )
+            )
+        identical = np.array_equal(spikes, np.concatenate([p[0] for p in parts]))
+        for key, values in state.items():
+            split = np.concatenate([p[1][key] for p in parts])
+            identical &= np.array_equal(values, split)
+        per_neuron = 3 if name.startswith("HH") else 1
+        draw_ns = draw_cost(args.neurons, args.steps, per_neuron, args.seed)
+        plain_ns = plain / (args.neurons * args.steps) * 1e9
+        results[name] = {
+            "ns_per_neuron_step": noisy / (args.neurons * args.steps) * 1e9,
+            "noise_overhead": noisy / plain - 1,
+            "noise_overhead_no_spare_core": draw_ns * per_neuron / plain_ns,
+            "mean_spikes": float(spikes.mean()),
+            "identical_when_split": bool(identical),
+        }
+        print(
+            f"{name:<28} {results[name]['ns_per_neuron_step']:7.1f} ns/neuron-step"
+            f"  noise +{results[name]['noise_overhead']:.0%}"
+            f" (+{results[name]['noise_overhead_no_spare_core']:.0%} draws alone)"
+            f"  spikes/neuron {results[name]['mean_spikes']:.2f}"
+            f"  identical when split: {identical}"
+        )
+    print(
+        "Draws are generated on a background thread; without a spare core "
+        "(e.g. one sharded\nworker per core) the overhead is at least that "
+        "of the draws alone."
+    )
+    if args.json:
+        args.json.write_text(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
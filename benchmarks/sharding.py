@@ -0,0 +1,96 @@
+"""Benchmark the strong scaling of the sharded hw1 populations.
+
+A fixed population is stepped with 1, 2, ... worker processes sharing its
+state through shared memory. For each worker count the script reports the
+throughput, the speedup and the parallel efficiency T1 / (k * Tk) against the
+single-worker run, and checks that the spike counts and final state are
+identical to it (they should be for any number of workers, coupling and
+noise included).
+
+    python benchmarks/sharding.py --neurons 200000 --steps 400 --workers 1 2 4
+"""
+
+import argparse
+import functools
+import json
+import sys
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from hw1.izhikevich import ModelType  # noqa: E402
+from hw1.populations import (  # noqa: E402
+    HHPopulation,
+    IzhikevichPopulation,
+    LIFPopulation,
+)
+from hw1.sharded import ShardedPopulation  # noqa: E402
+
+# make, noise, stimulus, dt, coupling
+MODELS = {
+    "HH": (HHPopulation, True, 8.0, 0.05, 5.0),
+    "Izhikevich RS": (
+        functools.partial(
+            IzhikevichPopulation.from_model_type, ModelType.REGULAR_SPIKING
+        ),
+        2.0,
+        5.0,
+        0.25,
+        20.0,
+    ),
+    "LIF": (LIFPopulation, 0.02, 0.03, 0.1, 0.005),
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--model", choices=list(MODELS), default="Izhikevich RS")
+    parser.add_argument("--neurons", type=int, default=200000)
+    parser.add_argument("--steps", type=int, default=400)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--sync-every", type=int, default=1)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", type=Path, help="Also write the results here")
+    args = parser.parse_args()
+
+    make, noise, stimulus, dt, coupling = MODELS[args.model]
+    make = functools.partial(make, noise=noise, seed=args.seed)
+    workers = sorted(set(args.workers) | {1})
+    results, reference = {}, None
+    for k in workers:
+        run = ShardedPopulation(
+            make,
+            args.neurons,
+            nWorkers=k,
+            syncEvery=args.sync_every,
+            stimulus=stimulus,
+            dt=dt,
+            coupling=coupling,
+        ).run(args.steps)
+        if reference is None:
+            reference = run
+        identical = np.array_equal(run["spike_counts"], reference["spike_counts"])
+        for name, values in run["state"].items():
+            identical &= np.array_equal(values, reference["state"][name])
+        speedup = reference["elapsed"] / run["elapsed"]
+        results[k] = {
+            "seconds": run["elapsed"],
+            "neuron_steps_per_s": args.neurons * args.steps / run["elapsed"],
+            "speedup": speedup,
+            "efficiency": speedup / k,
+            "identical": bool(identical),
+        }
+        print(
+            f"{k:>3} workers  {run['elapsed']:7.3f} s"
+            f"  {results[k]['neuron_steps_per_s'] / 1e6:7.1f} M neuron-steps/s"
+            f"  speedup {speedup:5.2f}  efficiency {speedup / k:4.0%}"
+            f"  identical: {identical}"
+        )
+    print(f"{float(reference['spike_counts'].mean()):.2f} spikes per neuron")
+    if args.json:
+        args.json.write_text(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
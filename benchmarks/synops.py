@@ -0,0 +1,83 @@
+"""Compare variants of the forward-kinematics network on estimated cost.
+
+Every variant of the hw3 part4 network (neuron type, firing rates) is run with
+a spike counter attached; the script reports its spikes, synaptic operations,
+the estimated energy and power on Loihi-like hardware (see common.accounting)
+and the SynOps per second of wall-clock time achieved by the Nengo reference
+simulator, next to the decoding error of the end-effector position.
+
+    python benchmarks/synops.py --duration 2 --json costs.json
+"""
+
+import argparse
+import json
+import sys
+from pathlib import Path
+
+import nengo
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from common.spike_counter import SpikeCounter  # noqa: E402
+from hw1.izhikevich import ModelType  # noqa: E402
+from hw1.nengo_neurons import Izhikevich  # noqa: E402
+from hw3.part4.ex1 import build_model  # noqa: E402
+
+VARIANTS = {
+    "LIF": {},
+    "LIF, 50-100 Hz": {"max_rates": nengo.dists.Uniform(50, 100)},
+    "Izhikevich (RS)": {
+        "neuron_type": Izhikevich.from_model_type(ModelType.REGULAR_SPIKING)
+    },
+}
+
+
+def angles(t):
+    return np.sin(t), np.cos(t), np.sin(2 * t)
+
+
+def benchmark(duration: float, **ensemble_defaults) -> dict:
+    with nengo.Network(seed=0) as outer:
+        for key, value in ensemble_defaults.items():
+            setattr(outer.config[nengo.Ensemble], key, value)
+        model, ensembles = build_model(*(lambda t, i=i: angles(t)[i] for i in range(3)))
+        probe = [nengo.Probe(ensembles[axis], synapse=0.01) for axis in "xy"]
+    counter = SpikeCounter(outer)
+    with nengo.Simulator(outer, progress_bar=False) as sim:
+        sim.run(duration)
+
+    theta1, theta2, theta3 = angles(sim.trange())
+    phases = np.cumsum([theta1, theta2, theta3], axis=0)
+    target = np.stack([np.cos(phases).sum(axis=0), np.sin(phases).sum(axis=0)], 1)
+    decoded = np.hstack([sim.data[p] for p in probe])
+    settled = sim.trange() > 0.1
+    summary = counter.summary(sim)
+    summary["rmse"] = float(np.sqrt(np.mean((decoded[settled] - target[settled]) ** 2)))
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--duration", type=float, default=2.0)
+    parser.add_argument("--json", type=Path, help="Also write the results here")
+    args = parser.parse_args()
+
+    results = {}
+    print(
+        f"{'variant':<18}{'spikes':>10}{'SynOps':>11}{'energy [uJ]':>13}"
+        f"{'power [mW]':>12}{'SynOps/wall s':>15}{'RMSE':>7}"
+    )
+    for name, defaults in VARIANTS.items():
+        results[name] = benchmark(args.duration, **defaults)
+        totals = results[name]["totals"]
+        print(
+            f"{name:<18}{totals['spikes']:>10.3g}{totals['synops']:>11.3g}"
+            f"{totals['energy_J'] * 1e6:>13.1f}{totals['power_W'] * 1e3:>12.2f}"
+            f"{totals['synops_per_wall_s']:>15.3g}{results[name]['rmse']:>7.3f}"
+        )
+    if args.json:
+        args.json.write_text(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1 @@
+"""Shared helpers for the homework scripts in ``hw1`` and ``hw3``."""
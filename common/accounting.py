@@ -0,0 +1,169 @@
+"""Spike and synaptic-operation accounting for neuromorphic cost estimates.
+
+Accounting is disabled unless the ``NEURO_ACCOUNTING`` environment variable
+names an output directory, e.g.::
+
+    NEURO_ACCOUNTING=costs python hw3/part4/ex1.py
+
+The hw1 models report their spikes with ``record_spikes`` and the Nengo
+networks through a spike counter (see common.spike_counter), which charges
+every connection out of an ensemble one synaptic operation (SynOp) per
+presynaptic spike per postsynaptic target (its fan-out), as a spike would be
+delivered on neuromorphic hardware. On exit each entry point writes
+``<name>.costs.json`` with the per-population spikes and rates, the
+per-connection SynOps and, per network, the totals with an energy and power
+estimate and the throughput needed to run in real time.
+"""
+
+import atexit
+import json
+import os
+from pathlib import Path
+
+from common.profiling import entry_name
+
+ENV_VAR = "NEURO_ACCOUNTING"
+
+# Energy per operation [pJ], roughly the figures reported for Intel's Loihi
+# (Davies et al., 2018): a synaptic operation, an inter-core spike and an
+# (inactive) neuron update
+LOIHI = {"synop_pJ": 23.6, "spike_pJ": 3.5, "neuron_update_pJ": 52.0}
+
+
+def cost_summary(
+    populations: dict, connections: dict, wall_s: float = None, costs: dict = LOIHI
+) -> dict:
+    """
+    Returns the cost summary of a network
+    Parameters:
+    populations: dict - {name: {"neurons", "spikes", "neuron_steps",
+        "duration_s"}} per population
+    connections: dict - {name: {"pre", "post", "fan_out", "spikes", "synops"}}
+        per connection
+    wall_s: float - Wall-clock time of the run [s], if known
+    costs: dict - Energy per SynOp, spike and neuron update [pJ]
+    """
+    spikes = sum(p["spikes"] for p in populations.values())
+    synops = sum(c["synops"] for c in connections.values())
+    updates = sum(p["neuron_steps"] for p in populations.values())
+    duration = max((p["duration_s"] for p in populations.values()), default=0.0)
+    energy = {
+        "synops": synops * costs["synop_pJ"] * 1e-12,
+        "spikes": spikes * costs["spike_pJ"] * 1e-12,
+        "neuron_updates": updates * costs["neuron_update_pJ"] * 1e-12,
+    }
+    totals = {
+        "neurons": sum(p["neurons"] for p in populations.values()),
+        "spikes": spikes,
+        "synops": synops,
+        "neuron_updates": updates,
+        "duration_s": duration,
+        "synops_per_s": synops / duration if duration else 0.0,
+        "energy_J": sum(energy.values()),
+        "energy_breakdown_J": energy,
+        "power_W": sum(energy.values()) / duration if duration else 0.0,
+    }
+    if wall_s:
+        totals["wall_s"] = wall_s
+        totals["synops_per_wall_s"] = synops / wall_s
+        totals["neuron_updates_per_wall_s"] = updates / wall_s
+    return {
+        "populations": {
+            name: dict(
+                p,
+                rate_hz=(
+                    p["spikes"] / (p["neurons"] * p["duration_s"])
+                    if p["duration_s"]
+                    else 0.0
+                ),
+            )
+            for name, p in populations.items()
+        },
+        "connections": connections,
+        "totals": totals,
+    }
+
+
+class Ledger:
+    def __init__(self, output_dir=None, costs=LOIHI):
+        self.output_dir = output_dir
+        self.enabled = output_dir is not None
+        self.costs = costs
+        self.networks = {}
+
+    def add(self, network, populations=None, connections=None, wall_s=None):
+        """
+        Adds the spikes and SynOps of a run to those of `network`
+        """
+        entry = self.networks.setdefault(
+            network, {"populations": {}, "connections": {}, "wall_s": 0.0}
+        )
+        for name, population in (populations or {}).items():
+            total = entry["populations"].setdefault(
+                name, dict(population, spikes=0, neuron_steps=0, duration_s=0.0)
+            )
+            for key in ("spikes", "neuron_steps", "duration_s"):
+                total[key] += population[key]
+        for name, connection in (connections or {}).items():
+            total = entry["connections"].setdefault(
+                name, dict(connection, spikes=0, synops=0)
+            )
+            total["spikes"] += connection["spikes"]
+            total["synops"] += connection["synops"]
+        entry["wall_s"] += wall_s or 0.0
+
+    def reset(self):
+        self.networks = {}
+
+    def merge(self, networks):
+        """
+        Adds the networks of another ledger (e.g. a worker process')
+        """
+        for name, network in networks.items():
+            self.add(name, **network)
+
+    def to_dict(self, entry):
+        return {
+            "entry": entry,
+            "costs_pJ": dict(self.costs),
+            "networks": {
+                name: cost_summary(**network, costs=self.costs)
+                for name, network in self.networks.items()
+            },
+        }
+
+    def dump(self, entry=None):
+        entry = entry or entry_name()
+        out = Path(self.output_dir)
+        out.mkdir(parents=True, exist_ok=True)
+        (out / f"{entry}.costs.json").write_text(
+            json.dumps(self.to_dict(entry), indent=2)
+        )
+
+
+def record_spikes(population: str, spikes, steps: int, dt: float, neurons: int = 1):
+    """
+    Adds the `spikes` fired by `neurons` neurons over `steps` steps of `dt`
+    seconds to `population` of the running script's ledger entry
+    """
+    if LEDGER.enabled:
+        LEDGER.add(
+            entry_name(),
+            {
+                population: {
+                    "neurons": neurons,
+                    "spikes": int(spikes),
+                    "neuron_steps": neurons * steps,
+                    "duration_s": steps * dt,
+                }
+            },
+        )
+
+
+def enabled() -> bool:
+    return LEDGER.enabled
+
+
+LEDGER = Ledger(os.environ.get(ENV_VAR) or None)
+if LEDGER.enabled:
+    atexit.register(LEDGER.dump)
@@ -0,0 +1,102 @@
+"""Plotting helpers for long simulation traces.
+
+``plot`` reduces a trace to the minimum and maximum sample of every
+horizontal pixel before handing it to matplotlib, which keeps the rendered
+image (spike peaks included) identical while drawing at most two points per
+pixel. ``render_parallel`` draws independent figures in worker processes and
+hands their profiling and accounting data back to the parent, as workers exit without
+running the ``atexit`` handlers that write it.
+"""
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from common import accounting, profiling
+
+
+def decimate(x, y, n_bins: int) -> tuple:
+    """
+    Returns the min/max decimation of y(x), keeping 2 samples per bin
+    Parameters:
+    x: np.array - Sample times (uniformly sampled, increasing)
+    y: np.array - Sample values
+    n_bins: int - Number of bins, usually the plot width in pixels
+
+    Returns:
+    x: np.array - Times of the kept samples
+    y: np.array - Values of the kept samples, in time order
+    """
+    x, y = np.asarray(x), np.asarray(y)
+    if y.ndim == 2 and y.shape[1] == 1:
+        y = y[:, 0]
+    if len(y) <= 2 * n_bins:
+        return x, y
+    width = -(-len(y) // n_bins)
+    binned = np.pad(y, (0, width * n_bins - len(y)), mode="edge").reshape(-1, width)
+    offsets = np.arange(n_bins)[:, None] * width
+    idx = np.sort(
+        np.stack([binned.argmin(axis=1), binned.argmax(axis=1)], axis=1), axis=1
+    )
+    idx = np.minimum((idx + offsets).ravel(), len(y) - 1)
+    idx = np.unique(np.concatenate(([0], idx, [len(y) - 1])))
+    return x[idx], y[idx]
+
+
+def plot(ax, x, y, *args, xlim=None, **kwargs):
+    """
+    Plots y(x) on `ax` after min/max decimation to the axes' pixel width
+    Samples outside of `xlim` are dropped before decimating, so zoomed-in
+    plots keep their full resolution.
+    """
+    x, y = np.asarray(x), np.asarray(y)
+    if xlim is not None:
+        lo, hi = np.searchsorted(x, xlim)
+        lo, hi = max(lo - 1, 0), hi + 1
+        x, y = x[lo:hi], y[lo:hi]
+    n_bins = max(int(ax.get_window_extent().width), 1)
+    return ax.plot(*decimate(x, y, n_bins), *args, **kwargs)
+
+
+def _init_worker():
+    import matplotlib
+
+    matplotlib.use("Agg")
+
+
+def _run_job(job):
+    profiling.PROFILER.reset()
+    accounting.LEDGER.reset()
+    result = job()
+    return (
+        result,
+        (profiling.PROFILER.phases, profiling.PROFILER.counters),
+        accounting.LEDGER.networks,
+    )
+
+
+def render_parallel(jobs, max_workers: int = None) -> list:
+    """
+    Runs each figure-rendering callable in `jobs` in a worker process
+    Jobs must be picklable (module-level functions, bound methods of
+    picklable objects or functools.partial) and should save and close their
+    own figures. Returns the results of the jobs in order.
+    The jobs' profiler phases and counters and their ledger entries are
+    merged into this process', the phases nested under the caller's current
+    phase. As the jobs run concurrently, their times may add up to more than
+    the caller's.
+    """
+    jobs = list(jobs)
+    max_workers = min(max_workers or os.cpu_count() or 1, len(jobs))
+    if max_workers <= 1:
+        return [job() for job in jobs]
+    with ProcessPoolExecutor(max_workers, initializer=_init_worker) as pool:
+        futures = [pool.submit(_run_job, job) for job in jobs]
+        results = []
+        for future in futures:
+            result, profile, networks = future.result()
+            profiling.PROFILER.merge(*profile)
+            accounting.LEDGER.merge(networks)
+            results.append(result)
+        return results
@@ -0,0 +1,172 @@
+"""Timing instrumentation for the simulation scripts.
+
+Profiling is disabled unless the ``NEURO_PROFILE`` environment variable names
+an output directory, e.g.::
+
+    NEURO_PROFILE=profiles python hw1/HH.py
+
+When disabled, ``timed`` returns the decorated function untouched and
+``phase`` hands back a shared no-op context manager, so instrumented code runs
+at full speed. When enabled, each entry point writes ``<name>.json`` (per-phase
+calls, total and self time plus counters) and ``<name>.folded`` (collapsed
+stacks in microseconds, ready for ``flamegraph.pl`` or speedscope) on exit.
+"""
+
+import atexit
+import functools
+import json
+import os
+import sys
+import time
+from contextlib import nullcontext
+from pathlib import Path
+
+ENV_VAR = "NEURO_PROFILE"
+
+
+class Profiler:
+    def __init__(self, output_dir=None):
+        self.output_dir = output_dir
+        self.enabled = output_dir is not None
+        self.stack = []
+        self.phases = {}
+        self.counters = {}
+        self.start = time.perf_counter()
+
+    def push(self, name):
+        self.stack.append([name, time.perf_counter(), 0.0])
+
+    def pop(self):
+        name, started, child_time = self.stack.pop()
+        elapsed = time.perf_counter() - started
+        key = ";".join([frame[0] for frame in self.stack] + [name])
+        stats = self.phases.setdefault(key, [0, 0.0, 0.0])
+        stats[0] += 1
+        stats[1] += elapsed
+        stats[2] += elapsed - child_time
+        if self.stack:
+            self.stack[-1][2] += elapsed
+
+    def count(self, name, n=1):
+        self.counters[name] = self.counters.get(name, 0) + int(n)
+
+    def reset(self):
+        self.stack = []
+        self.phases = {}
+        self.counters = {}
+
+    def merge(self, phases, counters):
+        """
+        Adds the phases and counters of another profiler (e.g. a worker
+        process'), nesting its phases under the current stack
+        """
+        prefix = "".join(frame[0] + ";" for frame in self.stack)
+        for key, stats in phases.items():
+            total = self.phases.setdefault(prefix + key, [0, 0.0, 0.0])
+            for i, value in enumerate(stats):
+                total[i] += value
+        for name, n in counters.items():
+            self.count(name, n)
+
+    def to_dict(self, entry):
+        return {
+            "entry": entry,
+            "wall_s": time.perf_counter() - self.start,
+            "phases": {
+                key: {"calls": calls, "total_s": total, "self_s": self_time}
+                for key, (calls, total, self_time) in self.phases.items()
+            },
+            "counters": dict(self.counters),
+        }
+
+    def folded(self):
+        return "\n".join(
+            f"{key} {round(self_time * 1e6)}"
+            for key, (_, _, self_time) in self.phases.items()
+            if round(self_time * 1e6) > 0
+        )
+
+    def dump(self, entry=None):
+        entry = entry or entry_name()
+        out = Path(self.output_dir)
+        out.mkdir(parents=True, exist_ok=True)
+        (out / f"{entry}.json").write_text(json.dumps(self.to_dict(entry), indent=2))
+        (out / f"{entry}.folded").write_text(self.folded() + "\n")
+
+
+class _Phase:
+    __slots__ = ("name",)
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        PROFILER.push(self.name)
+        return self
+
+    def __exit__(self, *exc):
+        PROFILER.pop()
+        return False
+
+
+_NULL_PHASE = nullcontext()
+
+
+def entry_name() -> str:
+    """
+    Returns a file-friendly name for the running script, e.g. "hw1-HH" or
+    "part4-ex1"
+    """
+    script = Path(sys.argv[0]) if sys.argv and sys.argv[0] else Path("python")
+    return f"{script.parent.name}-{script.stem}" if script.parent.name else script.stem
+
+
+def phase(name: str):
+    """
+    Returns a context manager timing the enclosed block as `name`
+    Nested phases are recorded as nested frames of the flamegraph.
+    """
+    if not PROFILER.enabled:
+        return _NULL_PHASE
+    return _Phase(name)
+
+
+def timed(name: str = None):
+    """
+    Decorator timing every call of the wrapped function
+    The function is returned unchanged when profiling is disabled.
+    """
+
+    def decorator(func):
+        if not PROFILER.enabled:
+            return func
+        label = name or func.__qualname__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            PROFILER.push(label)
+            try:
+                return func(*args, **kwargs)
+            finally:
+                PROFILER.pop()
+
+        return wrapper
+
+    return decorator
+
+
+def count(name: str, n: int = 1):
+    """
+    Adds `n` to the counter `name` (e.g. "steps" or "spikes")
+    """
+    if PROFILER.enabled:
+        PROFILER.count(name, n)
+
+
+def enabled() -> bool:
+    return PROFILER.enabled
+
+
+PROFILER = Profiler(os.environ.get(ENV_VAR) or None)
+if PROFILER.enabled:
+    atexit.register(PROFILER.dump)
@@ -0,0 +1,95 @@
+"""Reproducible random streams for large populations.
+
+A population is cut into fixed blocks of ``BLOCK_SIZE`` neurons and every
+block draws from its own generator, seeded by (seed, block index). The draws a
+neuron sees therefore depend only on the seed, its global index and the step
+number, and not on how the population is split across processes: a worker
+owning neurons [start, stop) regenerates the (at most two) partially owned
+blocks and keeps its share.
+
+Draws are generated as float32, several steps at a time (as many as fit in
+``buffer_bytes``, at most ``chunk_steps``), so that the generator is called
+once per block per chunk rather than once per step and the buffers stay
+small next to the population's state. The next chunk is generated on a
+background thread while the current one is consumed (numpy fills arrays
+without holding the GIL), which takes the generation off the simulation's
+critical path only when a spare core is available. Without one, e.g. with
+one sharded worker per core, the generation is paid in full.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+BLOCK_SIZE = 1024
+
+
+def block_rng(seed: int, block: int) -> np.random.Generator:
+    """
+    Returns the generator of block `block` of the population seeded `seed`
+    """
+    return np.random.Generator(
+        np.random.PCG64DXSM(np.random.SeedSequence(seed, spawn_key=(block,)))
+    )
+
+
+class BlockNormals:
+    """
+    Standard normal draws for neurons [start, stop) of a population
+    Every call to `next` returns a (per_neuron, stop - start) array of fresh
+    draws; the array is reused by later calls, so copy it to keep it.
+    """
+
+    def __init__(
+        self,
+        seed: int,
+        start: int,
+        stop: int,
+        per_neuron: int = 1,
+        block_size: int = BLOCK_SIZE,
+        chunk_steps: int = 64,
+        buffer_bytes: int = 4 * 2**20,
+        prefetch: bool = True,
+    ):
+        self.first_block = start // block_size
+        last_block = -(-stop // block_size)
+        self.offset = start - self.first_block * block_size
+        self.count = stop - start
+        self.rngs = [block_rng(seed, b) for b in range(self.first_block, last_block)]
+        # Block-major, so that every block is filled in place in one call
+        step_bytes = len(self.rngs) * per_neuron * block_size * 4
+        self.chunk_steps = max(1, min(chunk_steps, buffer_bytes // step_bytes))
+        shape = (len(self.rngs), self.chunk_steps, per_neuron, block_size)
+        self.buffer = np.empty(shape, dtype=np.float32)
+        self.spare = np.empty(shape, dtype=np.float32) if prefetch else None
+        self.draws = np.empty((per_neuron, len(self.rngs), block_size))
+        self.prefetch = prefetch
+        self.executor = None
+        self.pending = None
+        self.step = self.chunk_steps
+
+    def __fill(self, buffer: np.ndarray) -> np.ndarray:
+        for rng, block in zip(self.rngs, buffer):
+            rng.standard_normal(dtype=np.float32, out=block)
+        return buffer
+
+    def __refill(self):
+        if not self.prefetch:
+            self.__fill(self.buffer)
+        else:
+            if self.executor is None:
+                # Started lazily so that the object can be forked before use
+                self.executor = ThreadPoolExecutor(1)
+                self.pending = self.executor.submit(self.__fill, self.spare)
+            filled = self.pending.result()
+            self.spare, self.buffer = self.buffer, filled
+            self.pending = self.executor.submit(self.__fill, self.spare)
+        self.step = 0
+
+    def next(self) -> np.ndarray:
+        if self.step == self.chunk_steps:
+            self.__refill()
+        np.copyto(self.draws, self.buffer[:, self.step].transpose(1, 0, 2))
+        self.step += 1
+        draws = self.draws.reshape(self.draws.shape[0], -1)
+        return draws[:, self.offset : self.offset + self.count]
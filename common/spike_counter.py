@@ -0,0 +1,167 @@
+"""Spike counting for Nengo networks, for common.accounting and the profiler.
+
+``account`` adds a spike counter to a network: a single Node, fed by every
+ensemble's neurons through synapse-free connections, that adds the spikes of
+the whole network to one array per time step. Rate-mode neurons count their
+expected number of spikes. When both accounting and profiling are disabled,
+``account`` returns a shared no-op counter and nothing is added to the model.
+"""
+
+import time
+
+import nengo
+import numpy as np
+
+from common import profiling
+from common.accounting import LEDGER, LOIHI, cost_summary
+
+
+def _unique(name, taken):
+    unique, i = name, 1
+    while unique in taken:
+        i += 1
+        unique = f"{name} ({i})"
+    taken.add(unique)
+    return unique
+
+
+def _since(totals, before, keys):
+    return {
+        name: dict(
+            entry,
+            **{key: entry[key] - before.get(name, {}).get(key, 0) for key in keys},
+        )
+        for name, entry in totals.items()
+    }
+
+
+class SpikeCounter:
+    """
+    Counts the spikes of every ensemble of `model` during a simulation
+    Create it once the network is complete (connections added later are
+    still accounted) and before building the simulator.
+    """
+
+    def __init__(self, model: nengo.Network, label: str = "Spike Counter"):
+        self.model = model
+        ensembles = [
+            ens
+            for ens in model.all_ensembles
+            if not isinstance(ens.neuron_type, nengo.Direct)
+        ]
+        self.slices, self.names, taken, start = {}, {}, set(), 0
+        for i, ens in enumerate(ensembles):
+            self.slices[ens] = slice(start, start + ens.n_neurons)
+            self.names[ens] = _unique(ens.label or f"Ensemble {i}", taken)
+            start += ens.n_neurons
+        self.counts = np.zeros(start)
+        self.first = self.last = None
+        self.recorded = ({}, {}, 0.0)  # Totals already added by record()
+        with model:
+            self.node = nengo.Node(self.__accumulate, size_in=start, label=label)
+            self.own = {
+                nengo.Connection(ens.neurons, self.node[s], synapse=None)
+                for ens, s in self.slices.items()
+            }
+
+    def __accumulate(self, t, spikes):
+        self.last = time.perf_counter()
+        if self.first is None:
+            self.first = self.last
+        np.add(self.counts, spikes, out=self.counts)
+
+    def populations(self, sim: nengo.Simulator) -> dict:
+        return {
+            self.names[ens]: {
+                "neurons": ens.n_neurons,
+                "spikes": float(self.counts[s].sum() * sim.dt),
+                "neuron_steps": ens.n_neurons * sim.n_steps,
+                "duration_s": sim.n_steps * sim.dt,
+            }
+            for ens, s in self.slices.items()
+        }
+
+    def connections(self, sim: nengo.Simulator) -> dict:
+        result, taken = {}, set()
+        for conn in self.model.all_connections:
+            pre = conn.pre_obj
+            if conn in self.own:
+                continue
+            elif isinstance(pre, nengo.ensemble.Neurons):
+                ens = pre.ensemble
+                counts = self.counts[self.slices.get(ens, slice(0))][conn.pre_slice]
+            elif isinstance(pre, nengo.Ensemble):
+                ens = pre
+                counts = self.counts[self.slices.get(ens, slice(0))]
+            else:
+                continue  # Nodes deliver values, not spikes
+            post = conn.post_obj
+            if isinstance(post, nengo.Ensemble):
+                # Decoded connections reach every neuron through the encoders
+                fan_out, post_name = post.n_neurons, self.names.get(post, post.label)
+            elif isinstance(post, nengo.ensemble.Neurons):
+                fan_out = conn.size_out
+                post_name = self.names.get(post.ensemble, post.ensemble.label)
+            else:
+                fan_out, post_name = conn.size_out, post.label or "Node"
+            spikes = float(counts.sum() * sim.dt)
+            name = _unique(f"{self.names.get(ens, ens.label)} -> {post_name}", taken)
+            result[name] = {
+                "pre": self.names.get(ens, ens.label),
+                "post": post_name,
+                "fan_out": fan_out,
+                "spikes": spikes,
+                "synops": spikes * fan_out,
+            }
+        return result
+
+    def wall_s(self) -> float:
+        return self.last - self.first if self.first is not None else 0.0
+
+    def summary(self, sim: nengo.Simulator, costs: dict = LOIHI) -> dict:
+        """
+        Returns the cost summary of the run so far (see cost_summary)
+        """
+        return cost_summary(
+            self.populations(sim), self.connections(sim), self.wall_s(), costs
+        )
+
+    def record(self, sim: nengo.Simulator, network: str = None):
+        """
+        Adds what ran since the last call to the ledger written on exit, under
+        `network` (default the model's label), and its spikes to the profile
+        """
+        populations, connections = self.populations(sim), self.connections(sim)
+        wall_s = self.wall_s()
+        before, self.recorded = self.recorded, (populations, connections, wall_s)
+        spikes = sum(p["spikes"] for p in populations.values())
+        spikes_before = sum(p["spikes"] for p in before[0].values())
+        profiling.count("spikes", round(spikes) - round(spikes_before))
+        if LEDGER.enabled:
+            LEDGER.add(
+                network or self.model.label or profiling.entry_name(),
+                _since(
+                    populations, before[0], ("spikes", "neuron_steps", "duration_s")
+                ),
+                _since(connections, before[1], ("spikes", "synops")),
+                wall_s - before[2],
+            )
+
+
+class _NullCounter:
+    def record(self, sim, network=None):
+        pass
+
+
+_NULL_COUNTER = _NullCounter()
+
+
+def account(model: nengo.Network):
+    """
+    Returns a SpikeCounter for `model`, whose `record(sim)` adds the run to
+    the ledger and the profile, or a no-op counter when accounting and
+    profiling are both disabled
+    """
+    if not (LEDGER.enabled or profiling.enabled()):
+        return _NULL_COUNTER
+    return SpikeCounter(model)
@@ -0,0 +1,181 @@
+"""Declarative stimulus protocols.
+
+A protocol describes an injected current in time units (ms, like the rest of
+``hw1``) instead of sample indices, and is only evaluated on demand::
+
+    protocol = Step(5, 0.2) + Pulse(75, 5.25, 0.8)
+    for i, stim in enumerate(protocol.samples(n_steps, dt)):
+        ...
+
+``chunk`` evaluates an arbitrary window of samples and ``samples`` streams
+values chunk by chunk, so a protocol of any length costs O(chunk_size)
+memory. Edges are snapped to the nearest sample, i.e. a feature starting at
+``t`` switches on at sample ``round(t / dt)``.
+"""
+
+import numpy as np
+
+CHUNK_SIZE = 4096
+
+
+def _index(t, dt):
+    return int(round(t / dt))
+
+
+class Protocol:
+    def chunk(self, start: int, n: int, dt: float) -> np.ndarray:
+        """
+        Returns the stimulus at samples start, start + 1, ..., start + n - 1
+        """
+        raise NotImplementedError
+
+    def samples(self, n: int, dt: float, chunk_size: int = CHUNK_SIZE):
+        """
+        Yields the first `n` samples one at a time, evaluated `chunk_size` at
+        a time
+        """
+        for start in range(0, n, chunk_size):
+            yield from self.chunk(start, min(chunk_size, n - start), dt).tolist()
+
+    def __add__(self, other):
+        return Sum(self, other)
+
+    def __mul__(self, scale):
+        return Scaled(self, scale)
+
+    __rmul__ = __mul__
+
+
+class Window(Protocol):
+    """
+    Base class for features active on [start, stop) ms, stop=None meaning
+    "until the end of the simulation"
+    """
+
+    def __init__(self, start=0.0, stop=None):
+        self.start = start
+        self.stop = stop
+
+    def chunk(self, start, n, dt):
+        out = np.zeros(n)
+        lo = _index(self.start, dt)
+        hi = start + n if self.stop is None else _index(self.stop, dt)
+        first, last = max(lo, start), min(hi, start + n)
+        if first < last:
+            out[first - start : last - start] = self.evaluate(
+                np.arange(first - lo, last - lo), hi - lo, dt
+            )
+        return out
+
+    def evaluate(self, k, width, dt):
+        """
+        Returns the values at offsets `k` (in samples) from the window start
+        """
+        raise NotImplementedError
+
+
+class Step(Window):
+    def __init__(self, start, amplitude, stop=None):
+        super().__init__(start, stop)
+        self.amplitude = amplitude
+
+    def evaluate(self, k, width, dt):
+        return self.amplitude
+
+
+class Pulse(Window):
+    """
+    A single rectangular pulse, or a train of `count` pulses every `period` ms
+    """
+
+    def __init__(self, start, duration, amplitude, period=None, count=1):
+        stop = start + (duration if period is None else period * count)
+        super().__init__(start, stop)
+        self.duration = duration
+        self.amplitude = amplitude
+        self.period = period
+
+    def evaluate(self, k, width, dt):
+        if self.period is None:
+            return self.amplitude
+        on = k % _index(self.period, dt) < _index(self.duration, dt)
+        return np.where(on, self.amplitude, 0.0)
+
+
+class Ramp(Window):
+    """
+    Rises linearly from 0 to `amplitude` over [start, stop)
+    """
+
+    def __init__(self, start, stop, amplitude):
+        super().__init__(start, stop)
+        self.amplitude = amplitude
+
+    def evaluate(self, k, width, dt):
+        return self.amplitude * k / width
+
+
+class Triangle(Window):
+    """
+    Symmetric triangle over [start, stop) peaking at `amplitude`, sample for
+    sample identical to `amplitude * scipy.signal.windows.triang(width)`
+    """
+
+    def __init__(self, start, stop, amplitude):
+        super().__init__(start, stop)
+        self.amplitude = amplitude
+
+    def evaluate(self, k, width, dt):
+        return self.amplitude * (1 - np.abs(2 * k - (width - 1)) / (width + width % 2))
+
+
+class Noise(Window):
+    """
+    Gaussian white noise with the given mean and standard deviation
+
+    Values are drawn in fixed blocks seeded by (seed, block index), so any
+    sample has the same value however the protocol is chunked.
+    """
+
+    block_size = 4096
+
+    def __init__(self, std, mean=0.0, start=0.0, stop=None, seed=0):
+        super().__init__(start, stop)
+        self.std = std
+        self.mean = mean
+        self.seed = seed
+        self._cache = (None, None)
+
+    def _block(self, b):
+        if self._cache[0] != b:
+            rng = np.random.default_rng([self.seed, b])
+            self._cache = (b, rng.standard_normal(self.block_size))
+        return self._cache[1]
+
+    def evaluate(self, k, width, dt):
+        first, last = k[0] // self.block_size, k[-1] // self.block_size
+        draws = np.concatenate([self._block(b) for b in range(first, last + 1)])
+        return self.mean + self.std * draws[k - first * self.block_size]
+
+
+class Sum(Protocol):
+    def __init__(self, *parts):
+        self.parts = parts
+
+    def chunk(self, start, n, dt):
+        out = np.zeros(n)
+        for part in self.parts:
+            out += part.chunk(start, n, dt)
+        return out
+
+    def __add__(self, other):
+        return Sum(*self.parts, other)
+
+
+class Scaled(Protocol):
+    def __init__(self, protocol, scale):
+        self.protocol = protocol
+        self.scale = scale
+
+    def chunk(self, start, n, dt):
+        return self.scale * self.protocol.chunk(start, n, dt)
@@ -1,8 +1,46 @@
+import sys
+from pathlib import Path
+
 import matplotlib.pyplot as plt
 import numpy as np
 from mpl_toolkits.axes_grid1.inset_locator import zoomed_inset_axes
 from mpl_toolkits.axes_grid1.inset_locator import mark_inset
 
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from common.accounting import record_spikes  # noqa: E402
+from common.plotting import plot  # noqa: E402
+from common.profiling import count, phase, timed  # noqa: E402
+from common.stimulus import Step  # noqa: E402
+
+
+def gate_rates(Vm):
+    """
+    Returns the (alpha, beta) rates of the m, n and h gates
+    Vm is the membrane potential relative to rest [mV], either a scalar or an
+    array of compartments/neurons.
+    """
+    return (
+        (
+            0.1 * ((25 - Vm) / (np.exp((25 - Vm) / 10) - 1)),
+            4 * np.exp(-Vm / 18),
+        ),
+        (
+            0.01 * ((10 - Vm) / (np.exp((10 - Vm) / 10) - 1)),
+            0.125 * np.exp(-Vm / 80),
+        ),
+        (
+            0.07 * np.exp(-Vm / 20),
+            1 / (np.exp((30 - Vm) / 10) + 1),
+        ),
+    )
+
+
+def gate_steady_states(Vm) -> tuple:
+    """
+    Returns the steady-state (m, n, h) gate values at membrane potential Vm
+    """
+    return tuple(alpha / (alpha + beta) for alpha, beta in gate_rates(Vm))
+
 
 class HHModel:
 
@@ -33,14 +71,15 @@ class HHModel:
         self.IKleak = 0
         self.Isum = 0
 
+    @timed()
     def UpdateGateTimeConstants(self, Vm):
-        self.n.alpha = 0.01 * ((10 - Vm) / (np.exp((10 - Vm) / 10) - 1))
-        self.n.beta = 0.125 * np.exp(-Vm / 80)
-        self.m.alpha = 0.1 * ((25 - Vm) / (np.exp((25 - Vm) / 10) - 1))
-        self.m.beta = 4 * np.exp(-Vm / 18)
-        self.h.alpha = 0.07 * np.exp(-Vm / 20)
-        self.h.beta = 1 / (np.exp((30 - Vm) / 10) + 1)
+        (
+            (self.m.alpha, self.m.beta),
+            (self.n.alpha, self.n.beta),
+            (self.h.alpha, self.h.beta),
+        ) = gate_rates(Vm)
 
+    @timed()
     def UpdateCellVoltage(self, stimulusCurrent, deltaTms):
         self.INa = (
             np.power(self.m.state, 3) * self.gNa * self.h.state * (self.Vm - self.ENa)
@@ -50,78 +89,133 @@ class HHModel:
         self.Isum = stimulusCurrent - self.INa - self.IK - self.IKleak
         self.Vm += deltaTms * self.Isum / self.Cm
 
+    @timed()
     def UpdateGateStates(self, deltaTms):
         self.n.update(deltaTms)
         self.m.update(deltaTms)
         self.h.update(deltaTms)
 
+    @timed()
     def Iterate(self, stimulusCurrent=0, deltaTms=0.05):
         self.UpdateGateTimeConstants(self.Vm)
         self.UpdateCellVoltage(stimulusCurrent, deltaTms)
         self.UpdateGateStates(deltaTms)
 
 
-# Defining the tracing arrays, simulation parameters, and stimulation (step function)
-hh = HHModel()
-pointCount = 5000
-Vm = np.empty(pointCount)
-n = np.empty(pointCount)
-m = np.empty(pointCount)
-h = np.empty(pointCount)
-INa = np.empty(pointCount)
-IK = np.empty(pointCount)
-IKleak = np.empty(pointCount)
-Isum = np.empty(pointCount)
-times = np.arange(pointCount) * 0.05
-stim = np.zeros(pointCount)
-stim[2000:3000] = 10
-
-# Running the simulation
-for i in range(len(times)):
-    hh.Iterate(stimulusCurrent=stim[i], deltaTms=0.05)
-    Vm[i] = hh.Vm
-    n[i] = hh.n.state
-    m[i] = hh.m.state
-    h[i] = hh.h.state
-    INa[i] = hh.INa
-    IK[i] = hh.IK
-    IKleak[i] = hh.IKleak
-    Isum[i] = hh.Isum
-
-# Plotting the results
-# Create a figure with three subplots
-fig, axs = plt.subplots(3, 1, figsize=(10, 15))
-
-# Plot the membrane potential and stimuli in the first subplot
-axs[0].plot(times, Vm - 70, linewidth=2, label="Vm")
-axs[0].plot(times, stim - 70, label="Stimuli (Scaled)", linewidth=2, color="sandybrown")
-axs[0].set_ylabel("Membrane Potential (mV)", fontsize=15)
-axs[0].set_xlabel("Time (msec)", fontsize=15)
-axs[0].set_xlim([90, 160])
-axs[0].set_title("Hodgkin-Huxley Neuron Model", fontsize=15)
-axs[0].legend(loc=1)
-
-# Plot the gating variables in the second subplot
-axs[1].plot(times, m, label="m (Na)", linewidth=2)
-axs[1].plot(times, h, label="h (Na)", linewidth=2)
-axs[1].plot(times, n, label="n (K)", linewidth=2)
-axs[1].set_ylabel("Gate state", fontsize=15)
-axs[1].set_xlabel("Time (msec)", fontsize=15)
-axs[1].set_xlim([90, 160])
-axs[1].set_title("Hodgkin-Huxley Spiking Neuron Model: Gatings", fontsize=15)
-axs[1].legend(loc=1)
-
-# Plot the ion currents in the third subplot
-axs[2].plot(times, INa, label="INa", linewidth=2)
-axs[2].plot(times, IK, label="IK", linewidth=2)
-axs[2].plot(times, IKleak, label="Ileak", linewidth=2)
-axs[2].plot(times, Isum, label="Isum", linewidth=2)
-axs[2].set_ylabel("Current (uA)", fontsize=15)
-axs[2].set_xlabel("Time (msec)", fontsize=15)
-axs[2].set_xlim([90, 160])
-axs[2].set_title("Hodgkin-Huxley Spiking Neuron Model: Ion Currents", fontsize=15)
-axs[2].legend(loc=1)
-
-# Adjust layout for better visualization
-plt.tight_layout()
-plt.savefig(f"images/HH-1-{hh.ENa}-{hh.EK}-{hh.EKleak}.png")
+def hh_step(Vm, m, n, h, stimulusCurrent, deltaTms=0.05, gateNoise=None):
+    """
+    Advances a population of HH neurons by one Euler step, in place
+    Same update as HHModel.Iterate, applied to arrays of membrane potentials
+    and gate states (one entry per neuron).
+
+    gateNoise: tuple - Optional (xi, nNa, nK) adding Fox & Lu Langevin channel
+        noise, xi being (3, N) standard normal draws for m, n and h and nNa, nK
+        the number of Na and K channels per neuron (arrays or scalars)
+    """
+    (m_alpha, m_beta), (n_alpha, n_beta), (h_alpha, h_beta) = gate_rates(Vm)
+    INa = m**3 * HHModel.gNa * h * (Vm - HHModel.ENa)
+    IK = n**4 * HHModel.gK * (Vm - HHModel.EK)
+    IKleak = HHModel.gKleak * (Vm - HHModel.EKleak)
+    Vm += deltaTms * (stimulusCurrent - INa - IK - IKleak) / HHModel.Cm
+    if gateNoise is None:
+        m += deltaTms * (m_alpha * (1 - m) - m_beta * m)
+        n += deltaTms * (n_alpha * (1 - n) - n_beta * n)
+        h += deltaTms * (h_alpha * (1 - h) - h_beta * h)
+        return
+
+    # dx = (a(1 - x) - bx) dt + sqrt((a(1 - x) + bx) dt / N) xi
+    xi, nNa, nK = gateNoise
+    for gate, alpha, beta, channels, draws in (
+        (m, m_alpha, m_beta, nNa, xi[0]),
+        (n, n_alpha, n_beta, nK, xi[1]),
+        (h, h_alpha, h_beta, nNa, xi[2]),
+    ):
+        opening, closing = alpha * (1 - gate), beta * gate
+        gate += deltaTms * (opening - closing)
+        gate += np.sqrt(deltaTms * (opening + closing) / channels) * draws
+        np.clip(gate, 0, 1, out=gate)
+
+
+if __name__ == "__main__":
+    # Defining the tracing arrays, simulation parameters, and stimulation (step function)
+    hh = HHModel()
+    pointCount = 5000
+    Vm = np.empty(pointCount)
+    n = np.empty(pointCount)
+    m = np.empty(pointCount)
+    h = np.empty(pointCount)
+    INa = np.empty(pointCount)
+    IK = np.empty(pointCount)
+    IKleak = np.empty(pointCount)
+    Isum = np.empty(pointCount)
+    times = np.arange(pointCount) * 0.05
+    protocol = Step(100, 10, stop=150)
+
+    # Running the simulation
+    with phase("simulate"):
+        for i, stimulus in enumerate(protocol.samples(pointCount, 0.05)):
+            hh.Iterate(stimulusCurrent=stimulus, deltaTms=0.05)
+            Vm[i] = hh.Vm
+            n[i] = hh.n.state
+            m[i] = hh.m.state
+            h[i] = hh.h.state
+            INa[i] = hh.INa
+            IK[i] = hh.IK
+            IKleak[i] = hh.IKleak
+            Isum[i] = hh.Isum
+    spikes = np.count_nonzero((Vm[1:] >= 50) & (Vm[:-1] < 50))
+    count("steps", pointCount)
+    count("spikes", spikes)
+    record_spikes("HH", spikes, pointCount, 0.05e-3)
+
+    # Plotting the results
+    # Create a figure with three subplots
+    with phase("plot"):
+        stim = protocol.chunk(0, pointCount, 0.05)
+        xlim = [90, 160]
+        fig, axs = plt.subplots(3, 1, figsize=(10, 15))
+
+        # Plot the membrane potential and stimuli in the first subplot
+        plot(axs[0], times, Vm - 70, xlim=xlim, linewidth=2, label="Vm")
+        plot(
+            axs[0],
+            times,
+            stim - 70,
+            xlim=xlim,
+            label="Stimuli (Scaled)",
+            linewidth=2,
+            color="sandybrown",
+        )
+        axs[0].set_ylabel("Membrane Potential (mV)", fontsize=15)
+        axs[0].set_xlabel("Time (msec)", fontsize=15)
+        axs[0].set_xlim(xlim)
+        axs[0].set_title("Hodgkin-Huxley Neuron Model", fontsize=15)
+        axs[0].legend(loc=1)
+
+        # Plot the gating variables in the second subplot
+        plot(axs[1], times, m, xlim=xlim, label="m (Na)", linewidth=2)
+        plot(axs[1], times, h, xlim=xlim, label="h (Na)", linewidth=2)
+        plot(axs[1], times, n, xlim=xlim, label="n (K)", linewidth=2)
+        axs[1].set_ylabel("Gate state", fontsize=15)
+        axs[1].set_xlabel("Time (msec)", fontsize=15)
+        axs[1].set_xlim(xlim)
+        axs[1].set_title("Hodgkin-Huxley Spiking Neuron Model: Gatings", fontsize=15)
+        axs[1].legend(loc=1)
+
+        # Plot the ion currents in the third subplot
+        plot(axs[2], times, INa, xlim=xlim, label="INa", linewidth=2)
+        plot(axs[2], times, IK, xlim=xlim, label="IK", linewidth=2)
+        plot(axs[2], times, IKleak, xlim=xlim, label="Ileak", linewidth=2)
+        plot(axs[2], times, Isum, xlim=xlim, label="Isum", linewidth=2)
+        axs[2].set_ylabel("Current (uA)", fontsize=15)
+        axs[2].set_xlabel("Time (msec)", fontsize=15)
+        axs[2].set_xlim(xlim)
+        axs[2].set_title(
+            "Hodgkin-Huxley Spiking Neuron Model: Ion Currents", fontsize=15
+        )
+        axs[2].legend(loc=1)
+
+        # Adjust layout for better visualization
+        plt.tight_layout()
+    with phase("savefig"):
+        plt.savefig(f"images/HH-1-{hh.ENa}-{hh.EK}-{hh.EKleak}.png")
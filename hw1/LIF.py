@@ -1,9 +1,24 @@
+import functools
+import sys
 import numpy as np
 import matplotlib.pyplot as plt
-from scipy import signal
+from pathlib import Path
 
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from common.accounting import record_spikes  # noqa: E402
+from common.plotting import plot, render_parallel  # noqa: E402
+from common.profiling import count, phase, timed  # noqa: E402
+from common.stimulus import Protocol, Triangle  # noqa: E402
 
-def lif_model(Rm: int = 1, Cm: int = 5, I: float = 0.2, vTh: int = -40) -> tuple:
+
+@timed()
+def lif_model(
+    Rm: int = 1,
+    Cm: int = 5,
+    I: float = 0.2,
+    vTh: int = -40,
+    stimulus: Protocol = None,
+) -> tuple:
     """
     Returns the membrane potential of a LIF model
     Parameters:
@@ -11,6 +26,8 @@ def lif_model(Rm: int = 1, Cm: int = 5, I: float = 0.2, vTh: int = -40) -> tuple
     Cm: int - Capacitance [uF], default 5
     I: float - Current stimulus [mA], default 0.2
     vTh: int - Spike threshold [mV], default -40
+    stimulus: Protocol - Current stimulus [mA] over time [mSec], default a
+        triangle peaking at I
 
     Returns:
     time: np.array - Time array [mSec]
@@ -32,49 +49,105 @@ def lif_model(Rm: int = 1, Cm: int = 5, I: float = 0.2, vTh: int = -40) -> tuple
     spikes = []  # Spikes timings
 
     # Defining the stimulus
-    stim = I * 1e-3 * signal.windows.triang(len(time))  # Triangular stimulation pattern
+    if stimulus is None:
+        stimulus = Triangle(0, len(time) * dt, I)  # Triangular stimulation pattern
+    stim = stimulus.samples(len(time) - 1, dt)
 
     # Simulating the LIF model
-    for i, t in enumerate(time[:-1]):
+    for i, (t, I_t) in enumerate(zip(time[:-1], stim)):
         if t > t_init:
-            uinf = vRest * 1e-3 + Rm * 1e3 * stim[i]
+            uinf = vRest * 1e-3 + Rm * I_t
             Vm[i + 1] = uinf + (Vm[i] - uinf) * np.exp(-dt * 1e-3 / tau_m)
             if Vm[i] >= vTh * 1e-3:  # Spike
                 spikes.append(t * 1e3)
                 Vm[i] = vSpike * 1e-3
                 t_init = t + tau_ref * 1e-3
+    count("steps", len(time) - 1)
+    count("spikes", len(spikes))
+    record_spikes("LIF", len(spikes), len(time) - 1, dt * 1e-3)
     frequency = 1 / (np.mean(np.diff(spikes)) * 1e-3) if len(spikes) > 1 else 0
     return time, Vm, frequency
 
 
-def plot_if_curve():
+def lif_step(
+    Vm,
+    refractory,
+    stim,
+    dt: float = 0.1,
+    Rm: int = 1,
+    Cm: int = 5,
+    vTh: int = -40,
+    vRest: int = -70,
+    tau_ref: int = 1,
+) -> np.ndarray:
+    """
+    Advances a population of LIF neurons by one step, in place
+    Uses the exponential update and parameters of lif_model on arrays of
+    membrane potentials [mV] and remaining refractory times [mSec]; spiking
+    neurons are reset to vRest.
+
+    Returns:
+    spiked: np.array - Boolean mask of the neurons that spiked during the step
+    """
+    uinf = vRest + Rm * 1e3 * stim
+    decay = np.exp(-dt / (Rm * Cm))
+    active = refractory <= 0
+    Vm[active] = (uinf + (Vm - uinf) * decay)[active]
+    spiked = Vm >= vTh
+    Vm[spiked] = vRest
+    refractory -= dt
+    refractory[spiked] = tau_ref
+    return spiked
+
+
+@timed()
+def if_curves() -> tuple:
+    """
+    Returns the input currents [mA] and the firing rate [Hz] at each current
+    for every membrane time constant [ms]
+    """
     Rm_values = [1, 5, 10]
     Cm_values = [1, 5, 10]
     I_values = np.linspace(0, 5, 100)  # Input current range (mA)
+    curves = {
+        Rm * Cm: [lif_model(Rm=Rm, Cm=Cm, I=I)[2] for I in I_values]
+        for Rm, Cm in zip(Rm_values, Cm_values)
+    }
+    return I_values, curves
 
+
+@timed()
+def vt_curves() -> tuple:
+    """
+    Returns the input current [mA] and the (threshold, time, Vm) traces of
+    lif_model for every threshold [mV]
+    """
+    thresholds = [-60, -20, 20]  # Different thresholds in mV
+    current = 0.1  # Input current (mA)
+    return current, [(vTh, *lif_model(I=current, vTh=vTh)[:2]) for vTh in thresholds]
+
+
+@timed()
+def plot_if_curve(I_values, curves):
     plt.figure()
-    for Rm, Cm in zip(Rm_values, Cm_values):
-        f_values = [
-            frequency
-            for _, _, frequency in [lif_model(Rm=Rm, Cm=Cm, I=I) for I in I_values]
-        ]
-        plt.plot(I_values, f_values, label=f"Tau = {Rm * Cm} ms")
+    for tau, f_values in curves.items():
+        plt.plot(I_values, f_values, label=f"Tau = {tau} ms")
 
     plt.xlabel("Input Current (mA)")
     plt.ylabel("Firing Rate (Hz)")
     plt.title("I-F Curves for Different Tau Values")
     plt.legend()
-    plt.savefig("images/I-F.png")
+    with phase("savefig"):
+        plt.savefig("images/I-F.png")
+    plt.close()
 
 
-def plot_vt_curves():
-    thresholds = [-60, -20, 20]  # Different thresholds in mV
-    current = 0.1  # Input current (mA)
+@timed()
+def plot_vt_curves(current, traces):
     plt.figure(figsize=(10, 10))
-    for vTh in thresholds:
-        time, Vm, _ = lif_model(I=current, vTh=vTh)
-        plt.subplot(3, 1, thresholds.index(vTh) + 1)
-        plt.plot(time * 1e3, Vm * 1e3)
+    for i, (vTh, time, Vm) in enumerate(traces):
+        plt.subplot(len(traces), 1, i + 1)
+        plot(plt.gca(), time * 1e3, Vm * 1e3)
         plt.axhline(y=vTh, color="r", linestyle="--", label=f"Threshold = {vTh} mV")
         plt.xlabel("Time (ms)")
         plt.ylabel("Membrane Voltage (mV)")
@@ -82,9 +155,20 @@ def plot_vt_curves():
         plt.legend()
     plt.subplots_adjust(hspace=0.5)
     plt.tight_layout()
-    plt.savefig("images/V-T.png")
+    with phase("savefig"):
+        plt.savefig("images/V-T.png")
+    plt.close()
 
 
 if __name__ == "__main__":
-    plot_if_curve()
-    plot_vt_curves()
+    # Simulate in this process, then draw the figures in parallel
+    with phase("simulate"):
+        if_data = if_curves()
+        vt_data = vt_curves()
+    with phase("render"):
+        render_parallel(
+            [
+                functools.partial(plot_if_curve, *if_data),
+                functools.partial(plot_vt_curves, *vt_data),
+            ]
+        )
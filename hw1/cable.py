@@ -0,0 +1,131 @@
+import sys
+from pathlib import Path
+
+import matplotlib.pyplot as plt
+import numpy as np
+from scipy.linalg import solve_banded
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from common.accounting import record_spikes  # noqa: E402
+from common.plotting import plot  # noqa: E402
+from common.profiling import count, phase, timed  # noqa: E402
+from common.stimulus import Step  # noqa: E402
+from hw1.HH import HHModel, gate_rates, gate_steady_states  # noqa: E402
+
+
+class HHCable:
+    """
+    Unbranched cable of Hodgkin-Huxley compartments with sealed ends
+
+    Every compartment uses the channel kinetics of HHModel. The membrane and
+    axial currents are integrated with backward Euler (the channel
+    conductances being frozen at the start of the step), which makes the
+    voltage update a tridiagonal system: on an unbranched cable the Hines
+    ordering reduces to the Thomas algorithm, solved in O(N) by LAPACK's
+    banded solver. The update is stable at the 0.05 ms step used by HHModel
+    however fine the compartments are; the gates keep HHModel's forward Euler.
+    """
+
+    def __init__(
+        self, nCompartments=100, length=5000, diameter=2, Ra=35.4, startingVoltage=0
+    ):
+        """
+        Parameters:
+        nCompartments: int - Number of compartments, default 100
+        length: float - Cable length [um], default 5000
+        diameter: float - Cable diameter [um], default 2
+        Ra: float - Axial resistivity [Ohm cm], default 35.4
+        startingVoltage: float - Initial potential relative to rest [mV]
+        """
+        self.nCompartments = nCompartments
+        self.dx = length / nCompartments
+        # Axial conductance between neighbours per membrane area [mS/cm^2]
+        self.gAxial = 1e3 * (diameter * 1e-4) / (4 * Ra * (self.dx * 1e-4) ** 2)
+        # Number of neighbours of every compartment (none for a single one)
+        self.neighbours = np.zeros(nCompartments)
+        self.neighbours[1:] += 1
+        self.neighbours[:-1] += 1
+        self.Vm = np.full(nCompartments, float(startingVoltage))
+        self.m, self.n, self.h = (
+            np.full(nCompartments, state)
+            for state in gate_steady_states(startingVoltage)
+        )
+        self.bands = np.zeros((3, nCompartments))
+
+    @timed()
+    def Iterate(self, stimulusCurrent=0, deltaTms=0.05):
+        """
+        Advances the cable by one step
+        stimulusCurrent is injected in every compartment [uA/cm^2], either a
+        scalar or an array with one entry per compartment.
+        """
+        (m_alpha, m_beta), (n_alpha, n_beta), (h_alpha, h_beta) = gate_rates(self.Vm)
+        gNa = HHModel.gNa * self.m**3 * self.h
+        gK = HHModel.gK * self.n**4
+        gSum = gNa + gK + HHModel.gKleak
+        gE = gNa * HHModel.ENa + gK * HHModel.EK + HHModel.gKleak * HHModel.EKleak
+
+        # (Cm/dt + g + axial) V' - gAxial (V'[i-1] + V'[i+1]) = Cm/dt V + gE + I
+        self.bands[0, 1:] = -self.gAxial
+        self.bands[1] = HHModel.Cm / deltaTms + gSum + self.gAxial * self.neighbours
+        self.bands[2, :-1] = -self.gAxial
+        rhs = HHModel.Cm / deltaTms * self.Vm + gE + stimulusCurrent
+        self.Vm = solve_banded(
+            (1, 1),
+            self.bands,
+            rhs,
+            overwrite_ab=True,
+            overwrite_b=True,
+            check_finite=False,
+        )
+
+        self.m += deltaTms * (m_alpha * (1 - self.m) - m_beta * self.m)
+        self.n += deltaTms * (n_alpha * (1 - self.n) - n_beta * self.n)
+        self.h += deltaTms * (h_alpha * (1 - self.h) - h_beta * self.h)
+
+
+if __name__ == "__main__":
+    # A 5 mm cable stimulated over its first 250 um
+    cable = HHCable(nCompartments=200)
+    pointCount = 1000
+    deltaTms = 0.05
+    times = np.arange(pointCount) * deltaTms
+    protocol = Step(5, 100, stop=6)
+    recorded = [0, 50, 100, 150, 199]
+    Vm = np.empty((pointCount, len(recorded)))
+    stim = np.zeros(cable.nCompartments)
+    spikes = np.zeros(cable.nCompartments, dtype=int)  # Upward crossings of 50 mV
+
+    # Running the simulation
+    with phase("simulate"):
+        for i, stimulus in enumerate(protocol.samples(pointCount, deltaTms)):
+            stim[:10] = stimulus
+            below = cable.Vm < 50
+            cable.Iterate(stimulusCurrent=stim, deltaTms=deltaTms)
+            spikes += below & (cable.Vm >= 50)
+            Vm[i] = cable.Vm[recorded]
+    count("steps", pointCount)
+    count("compartment_steps", pointCount * cable.nCompartments)
+    count("spikes", spikes.sum())
+    record_spikes(
+        "HH cable", spikes.sum(), pointCount, deltaTms * 1e-3, cable.nCompartments
+    )
+
+    # Conduction velocity from the spike peaks at both ends of the recording
+    peaks = times[Vm.argmax(axis=0)]
+    distance = (recorded[-1] - recorded[0]) * cable.dx * 1e-3  # [mm]
+    print(f"Conduction velocity: {distance / (peaks[-1] - peaks[0]):.2f} m/s")
+
+    # Plotting the results
+    with phase("plot"):
+        plt.figure(figsize=(10, 5))
+        ax = plt.gca()
+        for j, compartment in enumerate(recorded):
+            x = compartment * cable.dx * 1e-3
+            plot(ax, times, Vm[:, j] - 70, linewidth=2, label=f"x = {x:.2f} mm")
+        plt.title("Hodgkin-Huxley Cable: Action Potential Propagation", fontsize=15)
+        plt.ylabel("Membrane Potential (mV)", fontsize=15)
+        plt.xlabel("Time (msec)", fontsize=15)
+        plt.legend(loc=1)
+    with phase("savefig"):
+        plt.savefig("images/HH-cable.png")
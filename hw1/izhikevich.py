@@ -1,6 +1,14 @@
+import sys
 import numpy as np
 import matplotlib.pyplot as plt
 from enum import Enum
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from common.accounting import record_spikes  # noqa: E402
+from common.plotting import plot, render_parallel  # noqa: E402
+from common.profiling import count, phase, timed  # noqa: E402
+from common.stimulus import Protocol, Pulse, Step  # noqa: E402
 
 
 class ModelType(Enum):
@@ -15,7 +23,18 @@ class ModelType(Enum):
 
 
 class IzhikevichModel:
-    def __init__(self, exp_type: ModelType, a, b, c, d, v0=-70, T=200, dt=0.25):
+    def __init__(
+        self,
+        exp_type: ModelType,
+        a,
+        b,
+        c,
+        d,
+        v0=-70,
+        T=200,
+        dt=0.25,
+        stimulus: Protocol = None,
+    ):
         self.x = 5
         self.y = 140
         self.exp_type = exp_type
@@ -27,59 +46,78 @@ class IzhikevichModel:
         self.T = T
         self.dt = dt
         self.time = np.arange(0, T + dt, dt)
-        self.stim = self.__get_stimuli()
+        self.stimulus = stimulus or self.__get_stimuli()
         self.trace = np.zeros((2, len(self.time)))
 
     def plot_model(self):
+        self.simulate()
+        self.plot()
+
+    def simulate(self):
         if self.exp_type == ModelType.RESONATOR:
-            self.__plot_resonator()
+            self.__simulate_resonator()
         else:
-            self.__plot_model()
+            self.__simulate_model()
 
-    def __plot(self):
+    @timed("plot")
+    def plot(self):
         plt.figure(figsize=(10, 5))
         plt.title("Izhikevich Model: {}".format(self.exp_type.value), fontsize=15)
         plt.ylabel("Membrane Potential (mV)", fontsize=15)
         plt.xlabel("Time (msec)", fontsize=15)
-        plt.plot(self.time, self.trace[0], linewidth=2, label="Vm")
-        plt.plot(self.time, self.trace[1], linewidth=2, label="Recovery", color="green")
-        plt.plot(
+        ax = plt.gca()
+        plot(ax, self.time, self.trace[0], linewidth=2, label="Vm")
+        plot(ax, self.time, self.trace[1], linewidth=2, label="Recovery", color="green")
+        plot(
+            ax,
             self.time,
-            self.stim + self.v0,
+            self.stimulus.chunk(0, len(self.time), self.dt) + self.v0,
             label="Stimuli (Scaled)",
             color="sandybrown",
             linewidth=2,
         )
         plt.legend(loc=1)
-        plt.savefig(f"images/{self.exp_type.value}.png")
+        with phase("savefig"):
+            plt.savefig(f"images/{self.exp_type.value}.png")
+        plt.close()
 
-    def __plot_resonator(self):
-        v = self.v0
-        u = self.b * v
-        for i in range(len(self.stim)):
-            v += self.dt * (0.04 * v**2 + self.x * v + self.y - u + self.stim[i])
-            u += self.dt * self.a * (self.b * v - u)
-            if v > 30:
-                v = self.c
-                u += self.d
-            self.trace[0, i] = v
-            self.trace[1, i] = u
-        self.__plot()
-
-    def __plot_model(self):
+    def __simulate_resonator(self):
         v = self.v0
         u = self.b * v
-        for i in range(len(self.stim)):
-            v += self.dt * (0.04 * v**2 + self.x * v + self.y - u + self.stim[i])
-            u += self.dt * self.a * (self.b * v - u)
-            if v > 30:
-                self.trace[0, i] = 30
-                v = self.c
-                u += self.d
-            else:
+        spikes = 0
+        with phase("simulate"):
+            for i, stim in enumerate(self.stimulus.samples(len(self.time), self.dt)):
+                v += self.dt * (0.04 * v**2 + self.x * v + self.y - u + stim)
+                u += self.dt * self.a * (self.b * v - u)
+                if v > 30:
+                    spikes += 1
+                    v = self.c
+                    u += self.d
                 self.trace[0, i] = v
                 self.trace[1, i] = u
-        self.__plot()
+        count("steps", len(self.time))
+        count("spikes", spikes)
+        record_spikes(self.exp_type.value, spikes, len(self.time), self.dt * 1e-3)
+
+    def __simulate_model(self):
+        v = self.v0
+        u = self.b * v
+        spikes = 0
+        with phase("simulate"):
+            for i, stim in enumerate(self.stimulus.samples(len(self.time), self.dt)):
+                v += self.dt * (0.04 * v**2 + self.x * v + self.y - u + stim)
+                u += self.dt * self.a * (self.b * v - u)
+                if v > 30:
+                    spikes += 1
+                    self.trace[0, i] = 30
+                    v = self.c
+                    u += self.d
+                else:
+                    self.trace[0, i] = v
+                    self.trace[1, i] = u
+        count("steps", len(self.time))
+        count("spikes", spikes)
+        record_spikes(self.exp_type.value, spikes, len(self.time), self.dt * 1e-3)
 
     def __get_stimuli(self):
         match self.exp_type:
@@ -93,28 +131,34 @@ class IzhikevichModel:
                 return self.__stim_func()
 
     def __stim_func(self):
-        stim = np.zeros(len(self.time))
-        stim[20:] = 10
-        return stim
+        return Step(5, 10)
 
     def __resonator_stim(self):
-        small_spike = 20
-        start_spike_bump = 300
-        spike_bump_length = 20
-        stim = np.zeros(len(self.time))
-        stim[small_spike:] = 0.2
-        stim[start_spike_bump : start_spike_bump + spike_bump_length + 1] = 1
-        return stim
+        # A weak step with a short bump on top of it
+        return Step(5, 0.2) + Pulse(75, 5.25, 0.8)
 
     def __thalamo_cortical_left_stim(self):
-        stim = np.zeros(len(self.time))
-        stim[400:] = 15
-        return stim
+        return Step(100, 15)
 
     def __thalamo_cortical_right_stim(self):
-        stim = np.zeros(len(self.time))
-        stim[:21] = -15
-        return stim
+        return Step(0, -15, stop=5.25)
+
+
+def izhikevich_step(v, u, stim, a, b, c, d, dt=0.25) -> np.ndarray:
+    """
+    Advances a population of Izhikevich neurons by one Euler step, in place
+    Same update as IzhikevichModel.simulate, applied to arrays of membrane
+    potentials `v` and recovery variables `u` (one entry per neuron).
+
+    Returns:
+    spiked: np.array - Boolean mask of the neurons that spiked during the step
+    """
+    v += dt * (0.04 * v**2 + 5 * v + 140 - u + stim)
+    u += dt * a * (b * v - u)
+    spiked = v > 30
+    v[spiked] = c
+    u[spiked] += d
+    return spiked
 
 
 experiments = [
@@ -191,15 +235,23 @@ experiments = [
         "T": 250,
     },
 ]
-# Run the experiments
-for exp in experiments:
-    model = IzhikevichModel(
-        exp_type=exp["exp_type"],
-        a=exp["a"],
-        b=exp["b"],
-        c=exp["c"],
-        d=exp["d"],
-        v0=exp["v0"],
-        T=exp["T"],
-    )
-    model.plot_model()
+if __name__ == "__main__":
+    # Run the experiments
+    models = []
+    for exp in experiments:
+        model = IzhikevichModel(
+            exp_type=exp["exp_type"],
+            a=exp["a"],
+            b=exp["b"],
+            c=exp["c"],
+            d=exp["d"],
+            v0=exp["v0"],
+            T=exp["T"],
+        )
+        with phase(exp["exp_type"].name):
+            model.simulate()
+        models.append(model)
+
+    # Render the figures in parallel
+    with phase("render"):
+        render_parallel(model.plot for model in models)
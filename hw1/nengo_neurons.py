@@ -0,0 +1,192 @@
+"""The hw1 neuron models packaged as Nengo neuron types.
+
+Both types update the whole ensemble with one vectorized call per Nengo time
+step, subdividing the (usually 1 ms) Nengo step into the millisecond Euler
+steps used in hw1, and can be dropped into any ``nengo.Ensemble``::
+
+    ens = nengo.Ensemble(
+        100, 1, neuron_type=HodgkinHuxley(), max_rates=nengo.dists.Uniform(60, 120)
+    )
+    ens = nengo.Ensemble(
+        100, 1, neuron_type=Izhikevich.from_model_type(ModelType.CHATTERING)
+    )
+
+Input currents J are in the units of the hw1 models (uA/cm^2 for HH, the
+dimensionless drive of the Izhikevich model).
+"""
+
+import functools
+import sys
+from pathlib import Path
+
+import numpy as np
+from nengo.dists import Choice
+from nengo.exceptions import ValidationError
+from nengo.neurons import NeuronType, settled_firingrate
+from nengo.params import NumberParam
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from hw1.HH import gate_steady_states, hh_step  # noqa: E402
+from hw1.izhikevich import ModelType, experiments, izhikevich_step  # noqa: E402
+
+PRESETS = {exp["exp_type"]: exp for exp in experiments}
+HH_REST = gate_steady_states(0.0)
+
+
+@functools.lru_cache(maxsize=None)
+def rate_curve(neuron_type) -> tuple:
+    """
+    Returns the steady-state (J, rate) response curve of `neuron_type`
+    Simulating every neuron at every evaluation point, as Nengo does when
+    solving for decoders, is far too slow for these models, so the response
+    is simulated once on the type's `rate_grid` and interpolated afterwards.
+    """
+    J = neuron_type.rate_grid
+    state = neuron_type.resting_state(len(J))
+    state["output"] = np.zeros_like(J)
+    rates = settled_firingrate(
+        neuron_type.step, J, state=state, settle_time=0.05, sim_time=1.0
+    )
+    return J, rates
+
+
+class HodgkinHuxley(NeuronType):
+    """
+    Hodgkin-Huxley neurons stepped with the same kinetics as hw1's HHModel
+
+    Voltage is relative to rest [mV]. A spike is emitted when the voltage
+    crosses `threshold` upwards. Input is clipped to [-15, 70] uA/cm^2, the
+    range in which forward Euler at 0.05 ms is stable and the model fires
+    tonically (about 130 Hz at the top), so max_rates must stay below that,
+    e.g. max_rates=nengo.dists.Uniform(60, 120) rather than Nengo's default
+    200-400 Hz.
+    """
+
+    state = {
+        "voltage": Choice([0.0]),
+        "m": Choice([HH_REST[0]]),
+        "n": Choice([HH_REST[1]]),
+        "h": Choice([HH_REST[2]]),
+    }
+    negative = False
+    spiking = True
+
+    substep = NumberParam("substep", low=0, low_open=True)
+    threshold = NumberParam("threshold")
+
+    J_min, J_max = -15.0, 70.0
+    rate_grid = np.linspace(J_min, J_max, 341)
+
+    def __init__(self, substep=0.05, threshold=60.0, initial_state=None):
+        super().__init__(initial_state)
+        self.substep = substep
+        self.threshold = threshold
+
+    def resting_state(self, n_neurons):
+        m, n, h = HH_REST
+        return {
+            "voltage": np.zeros(n_neurons),
+            "m": np.full(n_neurons, m),
+            "n": np.full(n_neurons, n),
+            "h": np.full(n_neurons, h),
+        }
+
+    def rates(self, x, gain, bias):
+        J, rates = rate_curve(self)
+        return np.interp(self.current(x, gain, bias), J, rates)
+
+    def gain_bias(self, max_rates, intercepts):
+        top = rate_curve(self)[1].max()
+        if np.max(max_rates) >= top:
+            raise ValidationError(
+                f"max_rates must be below {top:.0f} Hz, the fastest tonic firing of "
+                f"the HH model (got up to {np.max(max_rates):.0f} Hz); use e.g. "
+                "max_rates=nengo.dists.Uniform(60, 120)",
+                attr="max_rates",
+                obj=self,
+            )
+        return super().gain_bias(max_rates, intercepts)
+
+    def step(self, dt, J, output, voltage, m, n, h):
+        J = np.clip(J, self.J_min, self.J_max)
+        substeps = max(int(round(dt * 1e3 / self.substep)), 1)
+        deltaTms = dt * 1e3 / substeps
+        spikes = np.zeros_like(voltage)
+        for _ in range(substeps):
+            below = voltage < self.threshold
+            hh_step(voltage, m, n, h, J, deltaTms)
+            spikes += below & (voltage >= self.threshold)
+        output[:] = spikes / dt
+
+
+class Izhikevich(NeuronType):
+    """
+    Izhikevich neurons stepped with the same update as hw1's IzhikevichModel
+
+    Unlike `nengo.Izhikevich`, parameters keep their original a, b, c, d
+    names, the 1 ms Nengo step is split into `substep` ms Euler steps, and
+    `from_model_type` loads the hw1 presets.
+    """
+
+    state = {
+        "voltage": Choice([-70.0]),
+        "recovery": Choice([-14.0]),
+    }
+    negative = False
+    spiking = True
+
+    a = NumberParam("a", low=0, low_open=True)
+    b = NumberParam("b")
+    c = NumberParam("c")
+    d = NumberParam("d")
+    substep = NumberParam("substep", low=0, low_open=True)
+
+    rate_grid = np.concatenate(
+        [np.linspace(-30, 50, 321), np.geomspace(50, 5000, 201)[1:]]
+    )
+
+    def __init__(self, a=0.02, b=0.2, c=-65.0, d=8.0, substep=0.25, initial_state=None):
+        super().__init__(initial_state)
+        self.a = a
+        self.b = b
+        self.c = c
+        self.d = d
+        self.substep = substep
+
+    @classmethod
+    def from_model_type(cls, exp_type: ModelType, **kwargs):
+        """
+        Returns the neuron type of the hw1 experiment `exp_type`, starting
+        from its v0 at rest
+        """
+        preset = PRESETS[exp_type]
+        kwargs.setdefault(
+            "initial_state",
+            {
+                "voltage": Choice([preset["v0"]]),
+                "recovery": Choice([preset["b"] * preset["v0"]]),
+            },
+        )
+        return cls(a=preset["a"], b=preset["b"], c=preset["c"], d=preset["d"], **kwargs)
+
+    def resting_state(self, n_neurons):
+        return {
+            "voltage": np.full(n_neurons, -70.0),
+            "recovery": np.full(n_neurons, -70.0 * self.b),
+        }
+
+    def rates(self, x, gain, bias):
+        J, rates = rate_curve(self)
+        return np.interp(self.current(x, gain, bias), J, rates)
+
+    def step(self, dt, J, output, voltage, recovery):
+        # Very negative input makes the quadratic term diverge (as in nengo.Izhikevich)
+        J = np.maximum(-30.0, J)
+        substeps = max(int(round(dt * 1e3 / self.substep)), 1)
+        deltaTms = dt * 1e3 / substeps
+        spikes = np.zeros_like(voltage)
+        for _ in range(substeps):
+            spikes += izhikevich_step(
+                voltage, recovery, J, self.a, self.b, self.c, self.d, deltaTms
+            )
+        output[:] = spikes / dt
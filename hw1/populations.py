@@ -0,0 +1,169 @@
+"""Vectorized populations of the hw1 neuron models, with optional noise.
+
+Each population advances all of its neurons with one call per step and keeps
+its state as a dict of arrays, which may be passed in (e.g. views onto shared
+memory). A population can stand for neurons [start, start + nNeurons) of a
+larger one: noise is drawn from per-block streams (see common.rng), so a
+given seed produces the same noise for every neuron however the full
+population is split.
+"""
+
+import sys
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from common.rng import BlockNormals  # noqa: E402
+from hw1.HH import gate_steady_states, hh_step  # noqa: E402
+from hw1.LIF import lif_step  # noqa: E402
+from hw1.izhikevich import ModelType, experiments, izhikevich_step  # noqa: E402
+
+
+class Population:
+    stateNames = ()
+    drawsPerNeuron = 1
+
+    def __init__(self, nNeurons, noise=0.0, seed=0, start=0, state=None):
+        """
+        Parameters:
+        nNeurons: int - Number of neurons in this (part of the) population
+        noise: float - Noise amplitude, 0 for a deterministic population
+        seed: int - Seed of the full population
+        start: int - Global index of the first neuron, default 0
+        state: dict - State arrays to use instead of fresh ones
+        """
+        self.nNeurons = nNeurons
+        self.noise = noise
+        self.start = start
+        self.state = state if state is not None else self.initial_state(nNeurons)
+        self.normals = (
+            BlockNormals(seed, start, start + nNeurons, self.drawsPerNeuron)
+            if noise
+            else None
+        )
+
+    def initial_state(self, nNeurons) -> dict:
+        raise NotImplementedError
+
+    def step(self, stimulusCurrent) -> np.ndarray:
+        """
+        Advances every neuron by one step and returns the mask of the neurons
+        that spiked
+        """
+        raise NotImplementedError
+
+
+class HHPopulation(Population):
+    """
+    HH neurons with optional Langevin channel noise (noise=True)
+    The default channel counts correspond to a 100 um^2 patch at 60 Na and
+    18 K channels per um^2.
+    """
+
+    stateNames = ("Vm", "m", "n", "h")
+    drawsPerNeuron = 3
+
+    def __init__(
+        self, nNeurons, deltaTms=0.05, nNa=6000, nK=1800, threshold=60.0, **kwargs
+    ):
+        super().__init__(nNeurons, **kwargs)
+        self.deltaTms = deltaTms
+        self.nNa = nNa
+        self.nK = nK
+        self.threshold = threshold
+
+    def initial_state(self, nNeurons):
+        m, n, h = gate_steady_states(0.0)
+        return {
+            "Vm": np.zeros(nNeurons),
+            "m": np.full(nNeurons, m),
+            "n": np.full(nNeurons, n),
+            "h": np.full(nNeurons, h),
+        }
+
+    def step(self, stimulusCurrent):
+        Vm = self.state["Vm"]
+        below = Vm < self.threshold
+        gateNoise = (self.normals.next(), self.nNa, self.nK) if self.noise else None
+        hh_step(
+            Vm,
+            self.state["m"],
+            self.state["n"],
+            self.state["h"],
+            stimulusCurrent,
+            self.deltaTms,
+            gateNoise,
+        )
+        return below & (Vm >= self.threshold)
+
+
+class IzhikevichPopulation(Population):
+    """
+    Izhikevich neurons with optional Gaussian input noise, `noise` being the
+    standard deviation of the current added to every neuron at every step
+    """
+
+    stateNames = ("v", "u")
+
+    def __init__(self, nNeurons, a, b, c, d, v0=-70, dt=0.25, **kwargs):
+        self.a, self.b, self.c, self.d = a, b, c, d
+        self.v0 = v0
+        self.dt = dt
+        super().__init__(nNeurons, **kwargs)
+
+    @classmethod
+    def from_model_type(cls, exp_type: ModelType, nNeurons, **kwargs):
+        """
+        Returns a population of the hw1 experiment `exp_type`
+        """
+        preset = next(exp for exp in experiments if exp["exp_type"] == exp_type)
+        params = {key: preset[key] for key in ("a", "b", "c", "d", "v0")}
+        return cls(nNeurons, **params, **kwargs)
+
+    def initial_state(self, nNeurons):
+        return {
+            "v": np.full(nNeurons, float(self.v0)),
+            "u": np.full(nNeurons, self.b * self.v0),
+        }
+
+    def step(self, stimulusCurrent):
+        if self.noise:
+            stimulusCurrent = stimulusCurrent + self.noise * self.normals.next()[0]
+        return izhikevich_step(
+            self.state["v"],
+            self.state["u"],
+            stimulusCurrent,
+            self.a,
+            self.b,
+            self.c,
+            self.d,
+            self.dt,
+        )
+
+
+class LIFPopulation(Population):
+    """
+    LIF neurons with optional Gaussian input noise, `noise` being the standard
+    deviation [mA] of the current added to every neuron at every step
+    """
+
+    stateNames = ("Vm", "refractory")
+
+    def __init__(self, nNeurons, dt=0.1, Rm=1, Cm=5, vTh=-40, vRest=-70, **kwargs):
+        self.vRest = vRest
+        super().__init__(nNeurons, **kwargs)
+        self.params = dict(dt=dt, Rm=Rm, Cm=Cm, vTh=vTh, vRest=vRest)
+
+    def initial_state(self, nNeurons):
+        return {
+            "Vm": np.full(nNeurons, float(self.vRest)),
+            "refractory": np.zeros(nNeurons),
+        }
+
+    def step(self, stimulusCurrent):
+        if self.noise:
+            stimulusCurrent = stimulusCurrent + self.noise * self.normals.next()[0]
+        return lif_step(
+            self.state["Vm"], self.state["refractory"], stimulusCurrent, **self.params
+        )
@@ -0,0 +1,221 @@
+"""Sharded multi-process stepping of large hw1 populations.
+
+The state arrays of a population (v and u, or Vm, m, n and h, ...) and a
+spike buffer live in one ``multiprocessing.shared_memory`` block. Every
+worker process advances its own slice of neurons in place and the workers
+meet at a barrier once every ``syncEvery`` steps (1 for per-step lockstep,
+or the minimum synaptic delay). Nothing is pickled after start-up: workers
+write spikes straight into the shared buffer, which is double-buffered so
+that the parent can read one window while the workers fill the next.
+
+Optional all-to-all ``coupling`` feeds every neuron with the fraction of the
+population that spiked during the previous window, i.e. with a delay of one
+window, which is exactly what the barrier makes safe to read. Since noise
+streams are per neuron block (see common.rng) and the coupling only depends
+on integer spike counts, results do not depend on the number of workers.
+"""
+
+import multiprocessing
+import sys
+import threading
+import time
+from multiprocessing.connection import wait
+from multiprocessing.shared_memory import SharedMemory
+from pathlib import Path
+from threading import BrokenBarrierError
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from common.stimulus import Protocol  # noqa: E402
+
+
+def _layout(stateNames, nNeurons, nWorkers, syncEvery) -> tuple:
+    """
+    Returns the {name: (offset, shape, dtype)} layout of the shared block and
+    its size in bytes
+    """
+    arrays = [(name, (nNeurons,), np.float64) for name in stateNames]
+    arrays.append(("spikes", (2, syncEvery, nNeurons), np.bool_))
+    arrays.append(("counts", (2, nWorkers), np.int64))
+    layout, offset = {}, 0
+    for name, shape, dtype in arrays:
+        offset = -(-offset // 8) * 8  # Keep every array 8-byte aligned
+        layout[name] = (offset, shape, dtype)
+        offset += int(np.prod(shape)) * np.dtype(dtype).itemsize
+    return layout, offset
+
+
+def _views(shm: SharedMemory, layout: dict) -> dict:
+    return {
+        name: np.ndarray(shape, dtype, buffer=shm.buf, offset=offset)
+        for name, (offset, shape, dtype) in layout.items()
+    }
+
+
+def _stimuli(stimulus, nSteps, dt):
+    if isinstance(stimulus, Protocol):
+        yield from stimulus.samples(nSteps, dt)
+    else:
+        for _ in range(nSteps):
+            yield stimulus
+
+
+def _step_shard(sharded, arrays, worker, start, stop, nSteps, barrier):
+    state = {name: arrays[name][start:stop] for name in sharded.stateNames}
+    population = sharded.make(stop - start, start=start, state=state)
+    stimuli = _stimuli(sharded.stimulus, nSteps, sharded.dt)
+    spikes, counts = arrays["spikes"], arrays["counts"]
+    feedback = 0.0
+    for window, first in enumerate(range(0, nSteps, sharded.syncEvery)):
+        half = window % 2
+        if window and sharded.coupling:
+            spiked = counts[1 - half].sum()
+            feedback = (
+                sharded.coupling * spiked / (sharded.nNeurons * sharded.syncEvery)
+            )
+        steps = min(sharded.syncEvery, nSteps - first)
+        for k in range(steps):
+            spikes[half, k, start:stop] = population.step(next(stimuli) + feedback)
+        counts[half, worker] = np.count_nonzero(spikes[half, :steps, start:stop])
+        barrier.wait()
+
+
+def _worker(sharded, shmName, layout, worker, start, stop, nSteps, barrier):
+    shm = SharedMemory(shmName)
+    try:
+        _step_shard(sharded, _views(shm, layout), worker, start, stop, nSteps, barrier)
+    except BrokenBarrierError:
+        pass  # Another worker or the parent failed, and the parent reports it
+    except BaseException:
+        barrier.abort()
+        raise
+    finally:
+        try:
+            shm.close()
+        except BufferError:
+            pass  # Views held by a traceback; unmapped when the process exits
+
+
+def _watch(workers, barrier):
+    """
+    Aborts `barrier` as soon as a worker dies, e.g. killed by a signal before
+    it could abort the barrier itself
+    """
+    pending = {worker.sentinel: worker for worker in workers}
+    while pending:
+        for sentinel in wait(list(pending)):
+            worker = pending.pop(sentinel)
+            worker.join()
+            if worker.exitcode != 0:
+                barrier.abort()
+                return
+
+
+class ShardedPopulation:
+    def __init__(
+        self,
+        make,
+        nNeurons,
+        nWorkers=None,
+        syncEvery=1,
+        stimulus=0.0,
+        dt=0.05,
+        coupling=0.0,
+        timeout=60.0,
+    ):
+        """
+        Parameters:
+        make: callable - Builds a population as make(nNeurons, start=..., state=...),
+            e.g. functools.partial(HHPopulation, noise=True, seed=1)
+        nNeurons: int - Total number of neurons
+        nWorkers: int - Number of worker processes, default the number of CPUs
+        syncEvery: int - Steps between barriers (minimum delay window)
+        stimulus: float or Protocol - Input current common to every neuron
+        dt: float - Step [mSec], used to evaluate a Protocol stimulus
+        coupling: float - Current per unit fraction of neurons spiking per step
+        timeout: float - Longest wait [s] at a barrier before the run is
+            abandoned
+        """
+        self.make = make
+        self.nNeurons = nNeurons
+        self.nWorkers = nWorkers or multiprocessing.cpu_count()
+        self.syncEvery = syncEvery
+        self.stimulus = stimulus
+        self.dt = dt
+        self.coupling = coupling
+        self.timeout = timeout
+        self.initial = make(nNeurons).state
+        self.stateNames = tuple(self.initial)
+        self.state = None
+
+    def run(self, nSteps) -> dict:
+        """
+        Runs every worker for `nSteps` steps
+
+        Returns:
+        result: dict - Per-neuron "spike_counts", the final "state" and the
+            wall-clock "elapsed" time [s] of the stepping
+        """
+        layout, size = _layout(
+            self.stateNames, self.nNeurons, self.nWorkers, self.syncEvery
+        )
+        shm = SharedMemory(create=True, size=size)
+        arrays = _views(shm, layout)
+        try:
+            for name in self.stateNames:
+                arrays[name][:] = self.initial[name]
+            bounds = np.linspace(0, self.nNeurons, self.nWorkers + 1).astype(int)
+            barrier = multiprocessing.Barrier(self.nWorkers + 1)
+            workers = [
+                multiprocessing.Process(
+                    target=_worker,
+                    args=(self, shm.name, layout, i, start, stop, nSteps, barrier),
+                )
+                for i, (start, stop) in enumerate(zip(bounds[:-1], bounds[1:]))
+            ]
+            for worker in workers:
+                worker.start()
+            threading.Thread(
+                target=_watch, args=(workers, barrier), daemon=True
+            ).start()
+
+            spikeCounts = np.zeros(self.nNeurons, dtype=np.int64)
+            begin = time.perf_counter()
+            try:
+                for window, first in enumerate(range(0, nSteps, self.syncEvery)):
+                    barrier.wait(self.timeout)
+                    steps = min(self.syncEvery, nSteps - first)
+                    spikeCounts += arrays["spikes"][window % 2, :steps].sum(axis=0)
+            except BrokenBarrierError:
+                barrier.abort()
+                for worker in workers:
+                    worker.join(1.0)
+                failed = {
+                    i: worker.exitcode
+                    for i, worker in enumerate(workers)
+                    if worker.exitcode
+                }
+                for worker in workers:
+                    if worker.is_alive():
+                        worker.terminate()
+                        worker.join()
+                if failed:
+                    reason = f"workers exited with codes {failed}"
+                    if min(failed.values()) < 0:
+                        reason += " (-N: killed by signal N)"
+                else:
+                    reason = f"no progress within {self.timeout} s"
+                raise RuntimeError(
+                    f"Sharded run failed at step {first}: {reason}"
+                ) from None
+            for worker in workers:
+                worker.join()
+            elapsed = time.perf_counter() - begin
+
+            self.state = {name: arrays[name].copy() for name in self.stateNames}
+        finally:
+            arrays = None
+            shm.close()
+            shm.unlink()
+        return {"spike_counts": spikeCounts, "state": self.state, "elapsed": elapsed}
@@ -1,7 +1,15 @@
+import sys
+from pathlib import Path
+
 import nengo
 import numpy as np
 import matplotlib.pyplot as plt
 
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+from common.plotting import plot  # noqa: E402
+from common.profiling import count, phase  # noqa: E402
+from common.spike_counter import account  # noqa: E402
+
 # Create a Nengo model
 model = nengo.Network()
 with model:
@@ -19,14 +27,20 @@ with model:
     probe_output = nengo.Probe(output_node, synapse=0.01)
 
 # Run the simulation
-with nengo.Simulator(model) as sim:
+spike_counter = account(model)
+with phase("build"):
+    sim = nengo.Simulator(model)
+with sim, phase("run"):
     sim.run(1.0)
+count("steps", sim.n_steps)
+spike_counter.record(sim)
 
 # Plot the results
 plt.figure()
-plt.plot(sim.trange(), sim.data[probe_output], label="Decoded Output")
+plot(plt.gca(), sim.trange(), sim.data[probe_output], label="Decoded Output")
 plt.title("Encoding and Decoding with LIF Neurons")
 plt.xlabel("Time (s)")
 plt.ylabel("Value")
 plt.legend()
-plt.savefig("images/part1/ex3.png")
+with phase("savefig"):
+    plt.savefig("images/part1/ex3.png")
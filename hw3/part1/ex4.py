@@ -1,70 +1,71 @@
+import functools
+import sys
+from pathlib import Path
+
 import nengo
 import numpy as np
 import matplotlib.pyplot as plt
 
-# Create a Nengo model with 10 neurons
-model = nengo.Network()
-with model:
-    input_node = nengo.Node(lambda t: np.sin(2 * np.pi * t))
-    ens = nengo.Ensemble(n_neurons=10, dimensions=1)
-    nengo.Connection(input_node, ens)
-    probe_input = nengo.Probe(input_node)
-    probe_output = nengo.Probe(ens, synapse=0.01)
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+from common.plotting import plot, render_parallel  # noqa: E402
+from common.profiling import count, phase, timed  # noqa: E402
+from common.spike_counter import account  # noqa: E402
+
+
+def represent(n_neurons: int) -> tuple:
+    """
+    Returns the time, input and decoded output of a sine wave represented by
+    an ensemble of `n_neurons` neurons
+    Parameters:
+    n_neurons: int - Number of neurons of the ensemble
+    """
+    # Create a Nengo model with n_neurons neurons
+    model = nengo.Network()
+    with model:
+        input_node = nengo.Node(lambda t: np.sin(2 * np.pi * t))
+        ens = nengo.Ensemble(n_neurons=n_neurons, dimensions=1)
+        nengo.Connection(input_node, ens)
+        probe_input = nengo.Probe(input_node)
+        probe_output = nengo.Probe(ens, synapse=0.01)
+
+    # Run the simulation (Note: This may be computationally intensive)
+    spike_counter = account(model)
+    with phase("build"):
+        sim = nengo.Simulator(model)
+    with sim, phase("run"):
+        sim.run(1.0)
+    count("steps", sim.n_steps)
+    spike_counter.record(sim, f"{n_neurons:,} neurons")
+    return sim.trange(), sim.data[probe_input], sim.data[probe_output]
 
-# Run the simulation
-with nengo.Simulator(model) as sim:
-    sim.run(1.0)
 
-# Plot the results
-plt.figure()
-plt.plot(sim.trange(), sim.data[probe_input], label="Input Signal")
-plt.plot(sim.trange(), sim.data[probe_output], label="Decoded Output with 10 Neurons")
-plt.title("Representation with 10 Neurons")
-plt.xlabel("Time (s)")
-plt.ylabel("Value")
-plt.legend()
-plt.savefig("images/part1/ex4-1.png")
+@timed()
+def plot_representation(n_neurons, t, input_data, output_data, filename):
+    plt.figure()
+    plot(plt.gca(), t, input_data, label="Input Signal")
+    plot(
+        plt.gca(),
+        t,
+        output_data,
+        label=f"Decoded Output with {n_neurons:,} Neurons",
+    )
+    plt.title(f"Representation with {n_neurons:,} Neurons")
+    plt.xlabel("Time (s)")
+    plt.ylabel("Value")
+    plt.legend()
+    with phase("savefig"):
+        plt.savefig(filename)
+    plt.close()
 
-# Update the number of neurons to 100
-model = nengo.Network()
-with model:
-    input_node = nengo.Node(lambda t: np.sin(2 * np.pi * t))
-    ens = nengo.Ensemble(n_neurons=100, dimensions=1)
-    nengo.Connection(input_node, ens)
-    probe_input = nengo.Probe(input_node)
-    probe_output = nengo.Probe(ens, synapse=0.01)
-# Run the simulation
-with nengo.Simulator(model) as sim:
-    sim.run(1.0)
-# Plot the results
-plt.figure()
-plt.plot(sim.trange(), sim.data[probe_input], label="Input Signal")
-plt.plot(sim.trange(), sim.data[probe_output], label="Decoded Output with 100 Neurons")
-plt.title("Representation with 100 Neurons")
-plt.xlabel("Time (s)")
-plt.ylabel("Value")
-plt.legend()
-plt.savefig("images/part1/ex4-2.png")
 
-# Update the number of neurons to 10,000
-model = nengo.Network()
-with model:
-    input_node = nengo.Node(lambda t: np.sin(2 * np.pi * t))
-    ens = nengo.Ensemble(n_neurons=10000, dimensions=1)
-    nengo.Connection(input_node, ens)
-    probe_input = nengo.Probe(input_node)
-    probe_output = nengo.Probe(ens, synapse=0.01)
-# Run the simulation (Note: This may be computationally intensive)
-with nengo.Simulator(model) as sim:
-    sim.run(1.0)
-# Plot the results
-plt.figure()
-plt.plot(sim.trange(), sim.data[probe_input], label="Input Signal")
-plt.plot(
-    sim.trange(), sim.data[probe_output], label="Decoded Output with 10,000 Neurons"
-)
-plt.title("Representation with 10,000 Neurons")
-plt.xlabel("Time (s)")
-plt.ylabel("Value")
-plt.legend()
-plt.savefig("images/part1/ex4-3.png")
+if __name__ == "__main__":
+    # Simulate 10, 100 and 10,000 neurons, then draw the figures in parallel
+    sizes = [10, 100, 10000]
+    results = [represent(n_neurons) for n_neurons in sizes]
+    with phase("render"):
+        render_parallel(
+            functools.partial(
+                plot_representation, n_neurons, *data, f"images/part1/ex4-{i}.png"
+            )
+            for i, (n_neurons, data) in enumerate(zip(sizes, results), 1)
+        )
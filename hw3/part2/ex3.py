@@ -1,7 +1,15 @@
+import sys
+from pathlib import Path
+
 import nengo
 import numpy as np
 import matplotlib.pyplot as plt
 
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+from common.plotting import plot  # noqa: E402
+from common.profiling import count, phase  # noqa: E402
+from common.spike_counter import account  # noqa: E402
+
 # Create a Nengo model
 model = nengo.Network(label="Vector Transformation")
 with model:
@@ -23,16 +31,22 @@ with model:
     probe_output = nengo.Probe(output_ens, synapse=0.01)
 
 # Run the simulation
-with nengo.Simulator(model) as sim:
+spike_counter = account(model)
+with phase("build"):
+    sim = nengo.Simulator(model)
+with sim, phase("run"):
     sim.run(1.0)
+count("steps", sim.n_steps)
+spike_counter.record(sim)
 
 # Plot the results
 plt.figure(figsize=(10, 5))
-plt.plot(sim.trange(), sim.data[probe_input1], label="Input Signal 1 (sin)")
-plt.plot(sim.trange(), sim.data[probe_input2], label="Input Signal 2 (cos)")
-plt.plot(sim.trange(), sim.data[probe_output], label="Product Output")
+plot(plt.gca(), sim.trange(), sim.data[probe_input1], label="Input Signal 1 (sin)")
+plot(plt.gca(), sim.trange(), sim.data[probe_input2], label="Input Signal 2 (cos)")
+plot(plt.gca(), sim.trange(), sim.data[probe_output], label="Product Output")
 plt.title("Vector Transformation: Multiplying Two Signals")
 plt.xlabel("Time (s)")
 plt.ylabel("Amplitude")
 plt.legend()
-plt.savefig("images/part2/ex3.png")
+with phase("savefig"):
+    plt.savefig("images/part2/ex3.png")
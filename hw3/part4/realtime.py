@@ -0,0 +1,233 @@
+"""Run the forward-kinematics network in real time, in closed loop.
+
+Joint angles are read from an asyncio queue or a local TCP socket (one
+"theta1 theta2 theta3" line per update), the simulator is stepped in lockstep
+with the wall clock, and every step publishes the decoded end-effector (x, y).
+At the end the per-step latency percentiles and deadline misses are reported.
+
+    python hw3/part4/realtime.py --duration 5
+    python hw3/part4/realtime.py --source socket --port 8765
+"""
+
+import argparse
+import asyncio
+import json
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import nengo
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+from common.profiling import count, phase  # noqa: E402
+from common.spike_counter import account  # noqa: E402
+from hw3.part4.ex1 import build_model  # noqa: E402
+
+
+class JointAngles:
+    """
+    Latest joint angles received from the controller, read by the input nodes
+    """
+
+    def __init__(self):
+        self.angles = np.zeros(3)
+        self.updates = 0
+        self.clients = set()
+
+    def set(self, angles):
+        self.angles[:] = angles
+        self.updates += 1
+
+    async def read_queue(self, queue: asyncio.Queue):
+        while True:
+            self.set(await queue.get())
+
+    async def serve(self, host: str, port: int) -> asyncio.AbstractServer:
+        async def handle(reader, writer):
+            self.clients.add(asyncio.current_task())
+            async for line in reader:
+                try:
+                    self.set([float(value) for value in line.split()])
+                except ValueError:
+                    pass  # Ignore malformed lines rather than dropping the client
+            writer.close()
+            await writer.wait_closed()
+
+        return await asyncio.start_server(handle, host, port)
+
+    async def stop_serving(self, server: asyncio.AbstractServer):
+        """
+        Closes `server` once its clients have disconnected
+        """
+        await asyncio.gather(*self.clients)
+        server.close()
+        await server.wait_closed()
+
+
+class RealTimeRunner:
+    # The event loop wakes up with millisecond resolution, too coarse for
+    # 1 ms steps, so waits sleep in a helper thread (time.sleep is precise to
+    # tens of microseconds) and only the last spin_fraction of a step yields
+    # to the event loop in a loop
+    spin_fraction = 0.1
+
+    def __init__(self, model: nengo.Network, ensembles: dict, dt: float = 0.001):
+        self.end_effector = np.zeros(2)
+        with model:
+            sink = nengo.Node(self.__store, size_in=2, label="End Effector")
+            nengo.Connection(ensembles["x"], sink[0], synapse=0.01)
+            nengo.Connection(ensembles["y"], sink[1], synapse=0.01)
+        self.spike_counter = account(model)
+        with phase("build"):
+            self.sim = nengo.Simulator(model, dt=dt, progress_bar=False)
+        self.latencies = []
+        self.deadline_misses = 0
+        self.sleeper = ThreadPoolExecutor(1)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+    def close(self):
+        """
+        Closes the simulator and stops the sleeping thread
+        """
+        self.sim.close()
+        self.sleeper.shutdown()
+
+    def __store(self, t, xy):
+        self.end_effector[:] = xy
+
+    async def run(self, duration: float, outputs: asyncio.Queue = None):
+        """
+        Steps the simulator once per `dt` of wall-clock time for `duration`
+        seconds, putting (t, x, y) on `outputs` after every step
+        The latency of a step runs from the start of sim.step(), when the
+        input nodes read the latest joint angles, until its output has been
+        published. A step finishing after its deadline counts as a deadline miss; the
+        runner then carries on without sleeping, so it catches up if it can.
+        """
+        n_steps = int(round(duration / self.sim.dt))
+        start = time.perf_counter()
+        with phase("run"):
+            for step in range(n_steps):
+                step_start = time.perf_counter()
+                self.sim.step()
+                if outputs is not None:
+                    if outputs.full():
+                        outputs.get_nowait()  # Drop the oldest sample
+                    outputs.put_nowait((self.sim.time, *self.end_effector))
+                now = time.perf_counter()
+                self.latencies.append(now - step_start)
+                deadline = start + (step + 1) * self.sim.dt
+                if now > deadline:
+                    self.deadline_misses += 1
+                await self.__wait_until(deadline)
+        count("steps", n_steps)
+        count("deadline_misses", self.deadline_misses)
+        self.spike_counter.record(self.sim)
+
+    async def __wait_until(self, deadline: float):
+        remaining = deadline - time.perf_counter()
+        spin_time = self.spin_fraction * self.sim.dt
+        if remaining > spin_time:
+            await asyncio.get_running_loop().run_in_executor(
+                self.sleeper, time.sleep, remaining - spin_time
+            )
+        await asyncio.sleep(0)
+        while time.perf_counter() < deadline:
+            await asyncio.sleep(0)
+
+    def report(self) -> dict:
+        latencies = np.array(self.latencies) * 1e3
+        return {
+            "steps": len(latencies),
+            "dt_ms": self.sim.dt * 1e3,
+            "latency_ms": {
+                "p50": float(np.percentile(latencies, 50)),
+                "p90": float(np.percentile(latencies, 90)),
+                "p99": float(np.percentile(latencies, 99)),
+                "max": float(latencies.max()),
+            },
+            "deadline_misses": self.deadline_misses,
+        }
+
+
+async def stand_in_controller(send, duration: float, period: float = 0.01):
+    """
+    Stand-in for a live controller, sending the demo angles of ex1.py
+    (sin t, cos t, sin 2t) through `send` every `period` seconds
+    """
+    start = time.perf_counter()
+    while (t := time.perf_counter() - start) < duration:
+        await send((np.sin(t), np.cos(t), np.sin(2 * t)))
+        await asyncio.sleep(period)
+
+
+async def stand_in_consumer(outputs: asyncio.Queue, received: list):
+    """
+    Stand-in for whatever consumes the end-effector position, keeping the
+    number of samples received and the latest one
+    """
+    while True:
+        sample = await outputs.get()
+        received[:] = [received[0] + 1 if received else 1, sample]
+
+
+async def main(args):
+    joints = JointAngles()
+    model, ensembles = build_model(
+        lambda t: joints.angles[0],
+        lambda t: joints.angles[1],
+        lambda t: joints.angles[2],
+    )
+    with RealTimeRunner(model, ensembles, dt=args.dt) as runner:
+        outputs = asyncio.Queue(maxsize=1000)
+
+        if args.source == "socket":
+            server = await joints.serve("127.0.0.1", args.port)
+            _, writer = await asyncio.open_connection("127.0.0.1", args.port)
+
+            async def send(angles):
+                writer.write((" ".join(map(str, angles)) + "\n").encode())
+                await writer.drain()
+
+        else:
+            queue = asyncio.Queue()
+            reader = asyncio.create_task(joints.read_queue(queue))
+            send = queue.put
+
+        received = []
+        consumer = asyncio.create_task(stand_in_consumer(outputs, received))
+        controller = asyncio.create_task(stand_in_controller(send, args.duration))
+        await runner.run(args.duration, outputs)
+        await controller
+        consumer.cancel()
+
+        if args.source == "socket":
+            writer.close()
+            await writer.wait_closed()
+            await joints.stop_serving(server)
+        else:
+            reader.cancel()
+
+    report = runner.report()
+    report["joint_angle_updates"] = joints.updates
+    report["end_effector_samples"] = received[0] if received else 0
+    if received:
+        report["last_end_effector"] = dict(zip("txy", map(float, received[1])))
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--duration", type=float, default=5.0)
+    parser.add_argument("--dt", type=float, default=0.001)
+    parser.add_argument("--source", choices=["queue", "socket"], default="queue")
+    parser.add_argument("--port", type=int, default=8765)
+    asyncio.run(main(parser.parse_args()))